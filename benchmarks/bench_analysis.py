@@ -0,0 +1,64 @@
+import numpy as np
+from maze import analyze, wavefront
+from .mazes import MAZES, make_maze, random_maze
+
+# Benchmarks are asv-like classes: params are combined, setup() gets one
+# combination and every time_* method is timed with it.
+
+
+class Analyze:
+    params = (sorted(MAZES), [100, 500, 1000, 2000, 4000, 8000])
+    param_names = ('maze', 'size')
+
+    def setup(self, kind, size):
+        self.maze = make_maze(kind, size)
+
+    def time_analyze(self, kind, size):
+        analyze(self.maze)
+
+
+class Engines:
+    params = (['queue', 'hybrid', 'wavefront'], [100, 500, 1000, 2000])
+    param_names = ('engine', 'size')
+
+    def setup(self, engine, size):
+        self.maze = random_maze(size)
+        if engine == 'wavefront':
+            self.func = wavefront.analyze
+        else:
+            self.func = lambda maze: analyze(maze, engine=engine)
+
+    def time_engine(self, engine, size):
+        self.func(self.maze)
+
+
+class Path:
+    params = ([100, 500, 1000, 2000, 4000],)
+    param_names = ('size',)
+
+    def setup(self, size):
+        # corridors maze, the farthest cell has path over half of cells
+        self.analysis = analyze(make_maze('corridors', size))
+        self.far = np.unravel_index(np.argmax(self.analysis.distances), (size, size))
+
+    def time_path(self, size):
+        self.analysis.path(*self.far)
+
+    def time_path_array(self, size):
+        self.analysis.path(*self.far, as_array=True)
+
+
+class Paths:
+    params = ([10, 100, 1000], [100, 500, 1000, 2000])
+    param_names = ('starts', 'size')
+
+    def setup(self, starts, size):
+        self.analysis = analyze(random_maze(size))
+        free = np.argwhere(self.analysis.distances >= 0)
+        self.starts = free[np.random.RandomState(0).choice(len(free), starts)]
+
+    def time_paths(self, starts, size):
+        self.analysis.paths(self.starts)
+
+    def time_path_union(self, starts, size):
+        self.analysis.path_union(self.starts)
@@ -0,0 +1,99 @@
+import os
+import configparser
+import numpy as np
+from .mazes import random_maze
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # headless rendering
+
+VIEWPORT = (1600, 1000)  # pixels painted by paint_cells
+GUI = None
+
+
+def maze_gui():
+    # one QApplication per process, shared by all GUI benchmarks
+    global GUI
+    if GUI is None:
+        from maze import gui
+        config = configparser.ConfigParser()
+        config.read(gui.filepath(gui.CONFIG_FILE))
+        GUI = gui.MazeGUI(config)
+    return GUI
+
+
+def maze_with_dudes(size, dudes, seed=0):
+    rng = np.random.RandomState(seed)
+    maze = random_maze(size, seed)
+    free = np.flatnonzero(maze == 0)
+    maze.flat[rng.choice(free, min(dudes, len(free)), replace=False)] = 2
+    return maze
+
+
+class MakePaths:
+    params = ([1, 100, 1000], [100, 500, 1000])
+    param_names = ('dudes', 'size')
+
+    def setup(self, dudes, size):
+        self.grid = maze_gui().grid
+        self.grid.change_array(maze_with_dudes(size, dudes))
+
+    def time_make_paths(self, dudes, size):
+        self.grid.make_paths()
+
+
+class PaintCells:
+    params = ([64, 32, 16, 8, 4, 1],)
+    param_names = ('cell_size',)
+
+    def setup(self, cell_size):
+        from PyQt5 import QtCore, QtGui
+        self.grid = maze_gui().grid
+        self.grid.change_array(maze_with_dudes(300, 50))
+        self.grid.cell_size = cell_size
+        self.image = QtGui.QImage(*VIEWPORT, QtGui.QImage.Format_RGB32)
+        self.rect = QtCore.QRect(0, 0, *VIEWPORT)
+        self.actor_rect = QtCore.QRect(5 * cell_size, 5 * cell_size, 3 * cell_size, 3 * cell_size)
+        self.painter_type = QtGui.QPainter
+
+    def teardown(self, cell_size):
+        self.grid.zoom_reset()
+
+    def paint(self, rect):
+        painter = self.painter_type(self.image)
+        self.grid.paint_cells(rect, painter)
+        painter.end()
+
+    def time_paint_cells(self, cell_size):
+        self.paint(self.rect)
+
+    def time_paint_cells_cold(self, cell_size):
+        self.grid.invalidate_all()  # all tiles rendered from sprites again
+        self.paint(self.rect)
+
+    def time_paint_actor_update(self, cell_size):
+        # area repainted after an actor moved (3x3 cells)
+        self.paint(self.actor_rect)
+
+
+class GameClick:
+    params = ([10, 100, 1000],)
+    param_names = ('dudes',)
+
+    def setup(self, dudes):
+        from PyQt5 import QtCore, QtGui
+        from maze import analyze, gui
+        maze = random_maze(300)
+        reachable = np.flatnonzero((analyze(maze).distances > 0) & (maze == 0))
+        maze.flat[np.random.RandomState(0).choice(reachable, dudes, replace=False)] = 2
+        self.grid = gui.GridGameWidget(maze, maze_gui())
+        # free cell to build a wall on and destroy it again
+        row, col = np.argwhere((self.grid.array == 0) & (self.grid.analysis.distances > 0))[0]
+        point = QtCore.QPointF(*self.grid.table2px(row, col)) + QtCore.QPointF(1, 1)
+        self.click = QtGui.QMouseEvent(QtCore.QEvent.MouseButtonPress, point,
+                                       QtCore.Qt.LeftButton, QtCore.Qt.LeftButton, QtCore.Qt.NoModifier)
+
+    def teardown(self, dudes):
+        self.grid.finalize()
+
+    def time_toggle_wall(self, dudes):
+        self.grid.mousePressEvent(self.click)
+        self.grid.mousePressEvent(self.click)
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import numpy as np
+from maze import io
+from .mazes import random_maze
+
+
+class Load:
+    params = (['loadtxt', 'read_csv', 'maze', 'maze-zlib', 'maze-rle', 'maze-mmap'],
+              [500, 1000, 2000, 4000])
+    param_names = ('format', 'size')
+
+    def setup(self, fmt, size):
+        self.tmp = tempfile.TemporaryDirectory()
+        maze = random_maze(size)
+        if fmt in ('loadtxt', 'read_csv'):
+            self.path = os.path.join(self.tmp.name, 'maze.csv')
+            io.write_csv(self.path, maze)
+        else:
+            self.path = os.path.join(self.tmp.name, 'maze.maze')
+            compression = fmt[5:] if fmt in ('maze-zlib', 'maze-rle') else 'none'
+            io.save(self.path, maze, compression=compression)
+        self.load = {
+            'loadtxt': lambda path: np.loadtxt(path, delimiter=',', dtype='int8'),
+            'read_csv': io.read_csv,
+            'maze-mmap': lambda path: io.load(path, mmap_mode='r'),
+        }.get(fmt, io.load)
+
+    def teardown(self, fmt, size):
+        self.tmp.cleanup()
+
+    def time_load(self, fmt, size):
+        self.load(self.path)
@@ -0,0 +1,37 @@
+import numpy as np
+from maze import analyze, generate, simulation
+
+
+def game_maze(size, dudes, seed=0):
+    # perfect maze with dudes of all palette types on random free cells
+    maze = generate.generate((size, size), 'backtracker', seed=seed)
+    free = np.argwhere(maze == 0)
+    rng = np.random.RandomState(seed)
+    for i, (row, col) in enumerate(free[rng.choice(len(free), dudes, replace=False)]):
+        maze[row, col] = 2 + i % 5
+    return maze
+
+
+class Simulate:
+    params = (list(simulation.ENGINES), [1, 10, 100, 1000], [81, 201])
+    param_names = ('engine', 'dudes', 'size')
+
+    def setup(self, engine, dudes, size):
+        self.maze = game_maze(size, dudes)
+        self.analysis = analyze(self.maze)
+
+    def time_first(self, engine, dudes, size):
+        simulation.simulate(self.maze, 0, analysis=self.analysis, engine=engine)
+
+
+class SimulateAll:
+    # until all dudes arrive, scatterbrains and teleporters take long
+    params = (list(simulation.ENGINES), [1, 10, 100], [21, 41])
+    param_names = ('engine', 'dudes', 'size')
+
+    def setup(self, engine, dudes, size):
+        self.maze = game_maze(size, dudes)
+        self.analysis = analyze(self.maze)
+
+    def time_all(self, engine, dudes, size):
+        simulation.simulate(self.maze, 0, 'all', analysis=self.analysis, engine=engine)
@@ -0,0 +1,52 @@
+import numpy as np
+
+# Benchmark inputs, all deterministic and built without Python loops
+# over cells so that even 8000x8000 mazes are ready in a moment.
+
+WALL_SHARE = 0.3
+GOAL_SHARE = 0.001
+
+
+def random_maze(size, seed=0):
+    rng = np.random.RandomState(seed)
+    maze = np.where(rng.rand(size, size) < WALL_SHARE, -1, 0).astype('int8')
+    maze[rng.rand(size, size) < GOAL_SHARE] = 1
+    return maze
+
+
+def corridors_maze(size):
+    # serpentine: every other row is wall with a gap at alternating ends,
+    # single goal at the end gives path through the whole maze
+    maze = np.zeros((size, size), dtype='int8')
+    maze[1::2, :] = -1
+    maze[1::4, -1] = 0
+    maze[3::4, 0] = 0
+    maze[0, 0] = 1
+    return maze
+
+
+def open_maze(size):
+    maze = np.zeros((size, size), dtype='int8')
+    maze[size // 2, size // 2] = 1
+    return maze
+
+
+def unreachable_maze(size, seed=0):
+    # random maze with right half cut off by wall and without goals
+    maze = random_maze(size, seed)
+    maze[:, size // 2] = -1
+    maze[:, size // 2:][maze[:, size // 2:] == 1] = 0
+    return maze
+
+
+MAZES = {
+    'random': random_maze,
+    'corridors': corridors_maze,
+    'open': open_maze,
+    'unreachable': unreachable_maze,
+}
+
+
+def make_maze(kind, size):
+    return MAZES[kind](size)
+
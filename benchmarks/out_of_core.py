@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tempfile
+import numpy as np
+
+# Compares analyze_file (tiled, memory-mapped) with in-memory analysis
+# of the same maze file, each run in own process to measure peak RSS.
+
+SIZE = 4000
+TILE = 512
+WALL_SHARE = 0.3
+
+
+def make_maze_file(path, size, seed=0):
+    rng = np.random.RandomState(seed)
+    for _ in range(size):  # row by row, the maze itself may not fit memory
+        row = np.where(rng.rand(size) < WALL_SHARE, -1, 0).astype('int8')
+        row[rng.rand(size) < 0.0001] = 1
+        with open(path, 'ab') as f:
+            row.tofile(f)
+
+
+def run(mode, path, size, out_dir):
+    from maze import analysis
+    start = time.perf_counter()
+    if mode == 'tiled':
+        analysis.analyze_file(path, (size, size), out_dir, tile=TILE)
+    else:
+        maze = np.fromfile(path, dtype='int8').reshape(size, size)
+        analysis.analyze(maze, engine='queue')
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'mode': mode,
+        'seconds': elapsed,
+        'cells_per_second': size * size / elapsed,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run(sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        sys.exit()
+    size = int(os.environ.get('MAZE_BENCH_SIZE', SIZE))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'maze.int8')
+        make_maze_file(path, size)
+        for mode in ('memory', 'tiled'):
+            out = subprocess.check_output([
+                sys.executable, '-m', 'benchmarks.out_of_core',
+                mode, path, str(size), os.path.join(tmp, mode)
+            ])
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            print('{mode:>8}: {seconds:8.2f}s {cells_per_second:14,.0f} cells/s '
+                  '{peak_rss_mb:8.1f} MB peak RSS'.format(**result))
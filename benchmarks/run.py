@@ -0,0 +1,126 @@
+import argparse
+import datetime
+import importlib
+import inspect
+import itertools
+import json
+import platform
+import re
+import subprocess
+import sys
+import timeit
+import numpy as np
+
+# Runs asv-like benchmark classes from bench_* modules and saves results
+# as JSON, two such files (e.g. of two commits) can be compared:
+#
+#   python -m benchmarks.run run -o before.json
+#   python -m benchmarks.run run -o after.json
+#   python -m benchmarks.run compare before.json after.json
+
+MODULES = ['bench_analysis', 'bench_io', 'bench_gui', 'bench_simulation']
+REPEAT = 5
+MIN_TIME = 0.1  # seconds per repeat, short benchmarks are run in loop
+FACTOR = 1.2  # slower/faster threshold of compare
+
+
+def benchmarks(pattern=None, max_size=None):
+    for module_name in MODULES:
+        module = importlib.import_module('benchmarks.' + module_name)
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            methods = [m for m in dir(cls) if m.startswith('time_')]
+            names = list(getattr(cls, 'param_names', ()))
+            for params in itertools.product(*getattr(cls, 'params', ())):
+                if max_size and 'size' in names and params[names.index('size')] > max_size:
+                    continue
+                for method in methods:
+                    name = '{}.{}.{}'.format(module_name, cls_name, method)
+                    if pattern is None or re.search(pattern, name):
+                        yield name, cls, method, dict(zip(names, params))
+
+
+def measure(cls, method, params):
+    bench = cls()
+    args = list(params.values())
+    if hasattr(bench, 'setup'):
+        bench.setup(*args)
+    try:
+        func = getattr(bench, method)
+        timer = timeit.Timer(lambda: func(*args))
+        first = timer.timeit(1)  # also warms up caches
+        number = max(1, int(MIN_TIME / max(first, 1e-9)))
+        times = [t / number for t in timer.repeat(REPEAT, number)]
+    finally:
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*args)
+    return {'min': min(times), 'median': float(np.median(times)), 'number': number}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def run(args):
+    results = []
+    for name, cls, method, params in benchmarks(args.bench, args.max_size):
+        result = dict(name=name, params=params, **measure(cls, method, params))
+        results.append(result)
+        print('{:<45} {:<35} {:>12.6f}s'.format(name, json.dumps(params), result['min']))
+        sys.stdout.flush()
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': git_commit(),
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'results': results,
+        }, f, indent=1)
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = {key(r): r for r in json.load(f)['results']}
+    with open(args.new) as f:
+        new = {key(r): r for r in json.load(f)['results']}
+    regressions = 0
+    for k in sorted(set(old) & set(new)):
+        ratio = new[k]['min'] / old[k]['min']
+        mark = '+' if ratio > args.factor else '-' if ratio < 1 / args.factor else ' '
+        regressions += mark == '+'
+        print('{} {:>12.6f}s {:>12.6f}s {:>6.2f}  {} {}'.format(
+            mark, old[k]['min'], new[k]['min'], ratio, k[0], k[1]))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maze benchmarks.')
+    commands = parser.add_subparsers(dest='command')
+    run_parser = commands.add_parser('run', help='run benchmarks and save results')
+    run_parser.add_argument('-b', '--bench', help='regex filtering benchmark names')
+    run_parser.add_argument('-s', '--max-size', type=int, help='skip bigger mazes')
+    run_parser.add_argument('-o', '--output', default='benchmarks.json')
+    compare_parser = commands.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('-f', '--factor', type=float, default=FACTOR)
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        return compare(args)
+    if args.command is None:
+        args = run_parser.parse_args([])
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
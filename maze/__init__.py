@@ -1,4 +1,7 @@
-from .analysis import analyze, NoPathExistsException
+try:
+    from .analysis import analyze, analyze_many, path_overlay, MazeAnalysis, NoPathExistsException
+except ImportError:  # Cython extension not compiled, use slower NumPy one
+    from .wavefront import analyze, analyze_many, path_overlay, MazeAnalysis, NoPathExistsException
 from .gui import main
 
-__all__ = ['analyze', 'NoPathExistsException', 'main']
+__all__ = ['analyze', 'analyze_many', 'path_overlay', 'MazeAnalysis', 'NoPathExistsException', 'main']
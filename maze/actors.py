@@ -1,18 +1,63 @@
 import asyncio
 import contextlib
 import time
+import types
 import random
+from . import metrics
+from .teleport import TeleportSampler
 
 random.seed(time.monotonic())
 
 
+class RealClock:
+    """Clock of actors running in the asyncio (quamash) loop of the GUI
+    Actors read time, sleep, start their behavior and draw random numbers
+    only through a clock, so they can also run on virtual time
+    (see ``maze.simulation.VirtualClock``).
+    """
+    random = random
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        return asyncio.sleep(seconds)
+
+    def spawn(self, coro):
+        return asyncio.ensure_future(coro)
+
+
+real_clock = RealClock()
+
+
+@types.coroutine
+def sleep_ticks(ticks):
+    """Sleep of a coroutine resumed by a clock's own scheduler (not asyncio)
+    The scheduler gets ``ticks`` from ``coro.send`` and resumes the
+    coroutine that many ticks later.
+    """
+    yield ticks
+
+
+class ClockTask:
+    """Coroutine scheduled by a clock, cancelled like ``asyncio.Task``"""
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.cancelled = False
+
+    def cancel(self):
+        # closed by the clock, the task may be cancelled while running
+        self.cancelled = True
+
+
 class Actor:
     """
     Maze game actor
     Public domain: https://github.com/cvut/MI-PYT/blob/master/tutorials/10-async/actor.py
     Authors: @hroncok, @encukou (GitHub)
     """
-    def __init__(self, grid, row, column, kind):
+    def __init__(self, grid, row, column, kind, clock=real_clock):
         """Coroutine-based actor on a grid
         :param grid:
             The grid this actor moves on. Must have the following attributes:
@@ -34,15 +79,21 @@ class Actor:
         :param kind:
             Any data for use by the grid drawing code.
             This is stored in an attribute with the same name.
+        :param clock:
+            Source of time, sleeps and random numbers, ``real_clock``
+            by default.
+            This is stored in an attribute with the same name.
         The attribute ``task`` will hold an ``asyncio.Task`` object
-        corresponding to the actor's behavior. Cancel it when done.
+        (or task of the clock) corresponding to the actor's behavior.
+        Cancel it when done.
         """
         self.row = row
         self.column = column
         self.kind = kind
         self.grid = grid
+        self.clock = clock
         self.score = 0
-        self.task = asyncio.ensure_future(self.behavior())
+        self.task = clock.spawn(self.behavior())
         self.in_goal = False
 
     async def behavior(self):
@@ -84,14 +135,16 @@ class Actor:
         When using this with a for-loop, you probably need to put
         a sleep/delay into each iteration.
         """
-        last = start = time.monotonic()
+        last = start = self.clock.now()
         while True:
-            now = time.monotonic()
+            now = self.clock.now()
             self.score += (now - last)
             last = now
             p = (now - start) / duration
             if p > 1:
                 return
+            if metrics.enabled:
+                metrics.inc('actor_ticks')
             yield p
 
     @contextlib.contextmanager
@@ -127,7 +180,7 @@ class Actor:
 
             # Sleep amount is based on zoom level: we want to sleep for
             # about one pixel's worth of movement.
-            await asyncio.sleep(duration/self.grid.cell_size)
+            await self.clock.sleep(duration/self.grid.cell_size)
 
         # Final update to the exact ending position (this should use integer
         # arithmetic, so it avoids rounding errors)
@@ -146,15 +199,15 @@ class Actor:
                 # jump along a parabola
                 self.row = start_row - p * (1-p)
 
-            await asyncio.sleep(duration/self.grid.cell_size * 2)
+            await self.clock.sleep(duration/self.grid.cell_size * 2)
 
         with self._update_context():
             self.row = start_row
 
 
 class ActorWithSpeed(Actor):
-    def __init__(self, grid, row, column, kind):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, clock=real_clock):
+        super().__init__(grid, row, column, kind, clock)
         self.default_speed = 1 # seconds per cell
         self.speed_factor = 1
 
@@ -186,9 +239,11 @@ class ActorWithSpeed(Actor):
 
 # Speedy (75% faster actor)
 class SpeedyActor(ActorWithSpeed):
-    def __init__(self, grid, row, column, kind):
-        super().__init__(grid, row, column, kind)
-        self.speed_factor = 0.25
+    SPEED_FACTOR = 0.25
+
+    def __init__(self, grid, row, column, kind, clock=real_clock):
+        super().__init__(grid, row, column, kind, clock)
+        self.speed_factor = self.SPEED_FACTOR
 
 
 # Accelerator (can accelerate, up to 80% faster)
@@ -199,7 +254,7 @@ class AcceleratorActor(ActorWithSpeed):
 
     def speed_for_step(self):
         if self.MIN_SPEED_FACTOR < self.speed_factor and \
-           random.random() < self.ACCELERATE_PROB:
+           self.clock.random.random() < self.ACCELERATE_PROB:
             self.speed_factor -= self.ACCELERATE_STEP
         return self.speed_factor * self.default_speed
 
@@ -213,8 +268,8 @@ class JumperActor(Actor):
     D2 = [(-2, 0), (2, 0), (0, 2), (0, -2)]
     D1 = [(-1, 0), (1, 0), (0, 1), (0, -1)]
 
-    def __init__(self, grid, row, column, kind):
-        super().__init__(grid, row, column, kind)
+    def __init__(self, grid, row, column, kind, clock=real_clock):
+        super().__init__(grid, row, column, kind, clock)
         self.steps_without_jump = 0
 
     async def behavior(self):
@@ -259,7 +314,7 @@ class JumperActor(Actor):
     def can_jump_over(self, x, y):
         return self.steps_without_jump > self.STEPS_TO_JUMP and \
                ((x + y == -2) or (x + y == 2)) and \
-               random.random() < self.JUMP_PROB
+               self.clock.random.random() < self.JUMP_PROB
 
     async def jump_over(self, dr, dc, duration):
         self.steps_without_jump = 0
@@ -272,14 +327,14 @@ class JumperActor(Actor):
                     self.row = start_row + dr * p
                     self.column = start_col - p * (1 - p)
 
-                await asyncio.sleep(duration / self.grid.cell_size)
+                await self.clock.sleep(duration / self.grid.cell_size)
         else:
             for p in self._progress(duration):
                 with self._update_context():
                     self.row = start_row - p * (1 - p)
                     self.column = start_col + dc * p
 
-                await asyncio.sleep(duration / self.grid.cell_size)
+                await self.clock.sleep(duration / self.grid.cell_size)
 
         # Final update to the exact ending position (this should use integer
         # arithmetic, so it avoids rounding errors)
@@ -294,7 +349,6 @@ class TeleporterActor(Actor):
     MIN_DIST_GOAL = 5
     MIN_DIST_ACTOR = 5
     SHIVER_DURATION = 0.5
-    MAX_COUNT_SEARCH = 100
 
     async def behavior(self):
         while not self.grid.game_over:
@@ -321,7 +375,7 @@ class TeleporterActor(Actor):
                 await self.jump()
 
     def can_teleport(self):
-        return not self.in_goal and random.random() < self.TELEPORT_PROB
+        return not self.in_goal and self.clock.random.random() < self.TELEPORT_PROB
 
     async def teleport(self, row, col):
         await self.shiver(self.SHIVER_DURATION)
@@ -338,31 +392,18 @@ class TeleporterActor(Actor):
 
         for p in self._progress(duration):
             with self._update_context():
-                self.column = start_column - p * (random.random()-0.5) * 0.25
-                self.row = start_row - p * (random.random()-0.5) * 0.25
+                self.column = start_column - p * (self.clock.random.random()-0.5) * 0.25
+                self.row = start_row - p * (self.clock.random.random()-0.5) * 0.25
 
-            await asyncio.sleep(2*duration / self.grid.cell_size)
+            await self.clock.sleep(2*duration / self.grid.cell_size)
 
         with self._update_context():
             self.row = start_row
             self.column = start_column
 
     def pick_teleport_target(self):
-        shape = self.grid.analysis.directions.shape
-        row = int(self.row)
-        col = int(self.column)
-        count = 0
-        while not self.good_teleport_target(row, col):
-            row = random.randrange(0, shape[0])
-            col = random.randrange(0, shape[1])
-            count += 1
-            if count == self.MAX_COUNT_SEARCH:  # teleportation has failed
-                return int(self.row), int(self.column)
-        return row, col
-
-    def good_teleport_target(self, row, col):
-        return self.grid.analysis.distances[row, col] > self.MIN_DIST_GOAL and \
-               ((int(self.row) - row)**2 + (int(self.column) - col)**2) > self.MIN_DIST_GOAL**2
+        sampler = TeleportSampler.of(self.grid.analysis, self.MIN_DIST_GOAL, self.MIN_DIST_ACTOR)
+        return sampler.sample(self.clock.random, int(self.row), int(self.column))
 
 
 # Scatterbrain (can messup direction)
@@ -389,7 +430,7 @@ class ScatterbrainActor(Actor):
         if len(possible_dirs) == 0:
             return self.ANTI_DIRS_CHARS[self.DIRS_CHARS.index(direction)]
         else:
-            return random.choice(possible_dirs)
+            return self.clock.random.choice(possible_dirs)
 
     async def behavior(self):
         while not self.grid.game_over:
@@ -402,7 +443,7 @@ class ScatterbrainActor(Actor):
 
             self.in_goal = direction == b'X'
 
-            if random.random() < self.MESS_UP_PROB:
+            if self.clock.random.random() < self.MESS_UP_PROB:
                 direction = self.mess_up(row, column, direction)
 
             if direction == b'v':
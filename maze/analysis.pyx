@@ -1,68 +1,402 @@
 # distutils: language=c++
 import numpy as np
 cimport numpy as np
+import collections
 import cython
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
 from libcpp cimport bool
-from libcpp.queue cimport queue
+from libcpp.queue cimport queue, priority_queue
 from libcpp.vector cimport vector
 from libcpp.pair cimport pair
-from libcpp.map cimport map
+from libc.stdint cimport uint64_t
+from time import perf_counter
+from . import metrics
+from .io import as_maze
 
 cdef struct coords:
     int x
     int y
 
-cdef struct qitem:
-    int x
-    int y
-    int distance
+cdef struct ritem:
+    long long key
+    int cell
+
+cdef struct flood_stats:  # collected only when metrics are enabled
+    long long visited
+    long long high_water
+
+cdef extern from *:
+    int clzll "__builtin_clzll"(unsigned long long) nogil
+    int ctzll "__builtin_ctzll"(unsigned long long) nogil
+
+ctypedef fused dist_t:
+    np.int32_t
+    np.int64_t
+
+ctypedef fused narrow_t:
+    np.int8_t
+    np.int16_t
+    np.int32_t
+
+DEF HYBRID_ALPHA = 4  # go bottom-up when frontier > unvisited / ALPHA
+DEF HYBRID_BETA = 24  # go top-down again when frontier < cells / BETA
+DEF AUTO_HYBRID_CELLS = 65536  # smallest maze where 'auto' picks hybrid
+DEF AUTO_HYBRID_GOAL_SHARE = 10  # ... and at least every 10th cell is goal
+DEF DIAL_MAX_COST = 4096  # bigger costs use radix heap instead of buckets
+DEF CODE_WALL = 0  # codes of special cells in compact analysis,
+DEF CODE_GOAL = 1  # other cells have index of their direction
+DEF CODE_NONE = 2  # in from_chars as code
+
+ENGINES = ('auto', 'queue', 'hybrid')
+
+
+cdef coords *neighbor_offsets = [coords(1, 0), coords(-1, 0), coords(0, 1), coords(0, -1)]
+cdef np.int8_t *from_chars = [b'^', b'v', b'<', b'>']  # neighbor looks back at cell
+cdef np.int8_t *to_chars = [b'v', b'^', b'>', b'<']  # cell looks at neighbor
+cdef coords step_offsets[256]  # direction char -> where it leads
+step_offsets[<unsigned char>b'v'] = coords(1, 0)
+step_offsets[<unsigned char>b'^'] = coords(-1, 0)
+step_offsets[<unsigned char>b'>'] = coords(0, 1)
+step_offsets[<unsigned char>b'<'] = coords(0, -1)
+
+# Path overlay of the GUI: line bits of a cell (1 up, 2 left, 4 down,
+# 8 right) and arrow codes (0 up, 1 right, 2 left, 3 down)
+cdef np.int8_t line_bits[256]  # direction char -> line towards next cell
+cdef np.int8_t entry_bits[256]  # direction char -> line of next cell back
+cdef np.int8_t arrow_codes[256]
+line_bits[<unsigned char>b'^'], entry_bits[<unsigned char>b'^'], arrow_codes[<unsigned char>b'^'] = 1, 4, 0
+line_bits[<unsigned char>b'<'], entry_bits[<unsigned char>b'<'], arrow_codes[<unsigned char>b'<'] = 2, 8, 2
+line_bits[<unsigned char>b'v'], entry_bits[<unsigned char>b'v'], arrow_codes[<unsigned char>b'v'] = 4, 1, 3
+line_bits[<unsigned char>b'>'], entry_bits[<unsigned char>b'>'], arrow_codes[<unsigned char>b'>'] = 8, 2, 1
+
+
+cdef inline int parent_rank(np.int8_t direction) nogil:
+    # Among equally short paths the parent with the lowest offset index wins,
+    # so every engine ends up with the very same directions.
+    cdef int i
+    for i in range(4):
+        if from_chars[i] == direction:
+            return i
+    return 4
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef bool directions2reachable(np.ndarray[np.int8_t, ndim=2] directions, int w, int h):
+cdef bool directions2reachable(np.int8_t[:, :] directions, int w, int h) nogil:
+    cdef int x, y
     for x in range(w):
         for y in range(h):
-            if directions[x, y] == ord(b' '):
+            if directions[x, y] == b' ':
                 return False
     return True
 
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cpdef flood(np.ndarray[np.int8_t, ndim=2] maze, int w, int h):
-    cdef int x, y, i
-    cdef queue[qitem] q
-    cdef np.ndarray[np.int32_t, ndim=2] distances
-    cdef np.ndarray[np.int8_t, ndim=2] directions
-    distances = np.full((w, h), -1, dtype='int32')
-    directions = np.full((w, h), b' ', dtype=('a', 1))
-
+cdef int seed_goals(const np.int8_t[:, :] maze, np.int32_t[:, :] distances,
+                    np.int8_t[:, :] directions, int w, int h, vector[int] &frontier) nogil:
+    # Marks walls and goals, returns the number of other free cells
+    cdef int x, y
+    cdef int unvisited = 0
     for x in range(w):
         for y in range(h):
             if maze[x, y] < 0:
                 directions[x, y] = b'#'
             elif maze[x, y] == 1:
-                q.push(qitem(x, y, 0))
+                frontier.push_back(x * h + y)
                 distances[x, y] = 0
                 directions[x, y] = b'X'
+            else:
+                unvisited += 1
+    return unvisited
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void flood_queue(const np.int8_t[:, :] maze, np.int32_t[:, :] distances,
+                      np.int8_t[:, :] directions, int w, int h, flood_stats* stats) nogil:
+    cdef int x, y, i, cell, d
+    cdef vector[int] goals
+    cdef queue[int] q
+
+    seed_goals(maze, distances, directions, w, h, goals)
+    for cell in goals:
+        q.push(cell)
+    if stats != NULL:
+        stats.visited = q.size()
+        stats.high_water = q.size()
 
-    cdef coords *dir_offsets = [coords(1, 0), coords(-1, 0), coords(0, 1), coords(0, -1)]
-    cdef np.int8_t *dir_chars = [b'^', b'v', b'<', b'>']
     while not q.empty():
-        item = q.front()
+        cell = q.front()
         q.pop()
+        d = distances[cell // h, cell % h] + 1
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and maze[x, y] >= 0:
+                if distances[x, y] == -1:
+                    distances[x, y] = d
+                    directions[x, y] = from_chars[i]
+                    q.push(x * h + y)
+                    if stats != NULL:
+                        stats.visited += 1
+                        stats.high_water = max(stats.high_water, <long long>q.size())
+                elif distances[x, y] == d and i < parent_rank(directions[x, y]):
+                    directions[x, y] = from_chars[i]
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void flood_hybrid(const np.int8_t[:, :] maze, np.int32_t[:, :] distances,
+                       np.int8_t[:, :] directions, int w, int h, flood_stats* stats) nogil:
+    # Level-synchronous BFS: sparse frontier is expanded top-down from a list,
+    # dense frontier bottom-up by letting unvisited cells look for a parent.
+    cdef int x, y, i, cell, level = 0
+    cdef int cells = w * h
+    cdef int frontier_size, unvisited
+    cdef bool bottom_up = False
+    cdef vector[int] frontier, next_frontier
+    cdef vector[np.uint8_t] frontier_map, next_map
+
+    unvisited = seed_goals(maze, distances, directions, w, h, frontier)
+    frontier_size = frontier.size()
+    while frontier_size > 0:
+        if stats != NULL:
+            stats.visited += frontier_size
+            stats.high_water = max(stats.high_water, <long long>frontier_size)
+        if not bottom_up and frontier_size * HYBRID_ALPHA > unvisited:
+            bottom_up = True
+            frontier_map.assign(cells, 0)
+            next_map.assign(cells, 0)
+            for cell in frontier:
+                frontier_map[cell] = 1
+        elif bottom_up and frontier_size * HYBRID_BETA < cells:
+            bottom_up = False
+            frontier.clear()
+            for cell in range(cells):
+                if frontier_map[cell]:
+                    frontier.push_back(cell)
+
+        level += 1
+        frontier_size = 0
+        if bottom_up:
+            for x in range(w):
+                for y in range(h):
+                    cell = x * h + y
+                    next_map[cell] = 0
+                    if distances[x, y] != -1 or maze[x, y] < 0:
+                        continue
+                    if x > 0 and frontier_map[cell - h]:
+                        directions[x, y] = b'^'
+                    elif x < w - 1 and frontier_map[cell + h]:
+                        directions[x, y] = b'v'
+                    elif y > 0 and frontier_map[cell - 1]:
+                        directions[x, y] = b'<'
+                    elif y < h - 1 and frontier_map[cell + 1]:
+                        directions[x, y] = b'>'
+                    else:
+                        continue
+                    distances[x, y] = level
+                    next_map[cell] = 1
+                    frontier_size += 1
+            frontier_map.swap(next_map)
+        else:
+            next_frontier.clear()
+            for cell in frontier:
+                for i in range(4):
+                    x = cell // h + neighbor_offsets[i].x
+                    y = cell % h + neighbor_offsets[i].y
+                    if 0 <= x < w and 0 <= y < h and maze[x, y] >= 0:
+                        if distances[x, y] == -1:
+                            distances[x, y] = level
+                            directions[x, y] = from_chars[i]
+                            next_frontier.push_back(x * h + y)
+                        elif distances[x, y] == level and i < parent_rank(directions[x, y]):
+                            directions[x, y] = from_chars[i]
+            frontier.swap(next_frontier)
+            frontier_size = frontier.size()
+        unvisited -= frontier_size
+
+
+cpdef flood(const np.int8_t[:, :] maze, int w, int h, engine='queue',
+            distances=None, directions=None):
+    cdef bool reachable, hybrid
+    if engine not in ENGINES:
+        raise ValueError('Unknown analysis engine: "{}".'.format(engine))
+    hybrid = engine == 'hybrid'
+    if engine == 'auto' and w * h >= AUTO_HYBRID_CELLS:
+        # frontier gets dense quickly only when there are lots of goals
+        hybrid = np.count_nonzero(np.asarray(maze) == 1) * AUTO_HYBRID_GOAL_SHARE >= w * h
+    # outputs can be given e.g. as memory-mapped files, filled in place
+    if distances is None:
+        distances = np.empty((w, h), dtype='int32')
+    if directions is None:
+        directions = np.empty((w, h), dtype='S1')
+    if distances.shape != (w, h) or directions.shape != (w, h) or directions.dtype != 'S1':
+        raise ValueError('Output arrays must be int32 and S1 of the maze shape.')
+    distances.fill(-1)
+    directions.fill(b' ')
+    cdef np.int32_t[:, :] distances_view = distances
+    cdef np.int8_t[:, :] directions_view = directions.view('int8')
+    cdef flood_stats stats = flood_stats(0, 0)
+    cdef flood_stats* stats_ptr = &stats if metrics.enabled else NULL
+    start = perf_counter() if stats_ptr != NULL else 0
+    with nogil:  # let other threads analyze their mazes meanwhile
+        if hybrid:
+            flood_hybrid(maze, distances_view, directions_view, w, h, stats_ptr)
+        else:
+            flood_queue(maze, distances_view, directions_view, w, h, stats_ptr)
+        reachable = directions2reachable(directions_view, w, h)
+    if stats_ptr != NULL:
+        metrics.observe('flood_seconds', perf_counter() - start)
+        metrics.inc('flood_cells_visited', stats.visited)
+        metrics.set_max('flood_queue_high_water', stats.high_water)
+    return distances, directions, reachable
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void flood_dial(const np.int8_t[:, :] maze, const np.int32_t[:, :] costs,
+                     dist_t[:, :] distances, np.int8_t[:, :] directions,
+                     int w, int h, int max_cost) nogil:
+    # Dijkstra with circular bucket queue (Dial), step from cell costs costs[cell]
+    cdef int x, y, i, cell
+    cdef long long d, nd, pending = 0
+    cdef vector[vector[int]] buckets
+    cdef vector[int] bucket
+    buckets.resize(max_cost + 1)
+
+    for x in range(w):
+        for y in range(h):
+            if maze[x, y] < 0:
+                directions[x, y] = b'#'
+            elif maze[x, y] == 1:
+                buckets[0].push_back(x * h + y)
+                distances[x, y] = 0
+                directions[x, y] = b'X'
+                pending += 1
+
+    d = 0
+    while pending > 0:
+        bucket.swap(buckets[d % (max_cost + 1)])
+        for cell in bucket:
+            pending -= 1
+            if distances[cell // h, cell % h] != d:
+                continue  # already reached cheaper
+            for i in range(4):
+                x = cell // h + neighbor_offsets[i].x
+                y = cell % h + neighbor_offsets[i].y
+                if 0 <= x < w and 0 <= y < h and maze[x, y] >= 0:
+                    nd = d + costs[x, y]
+                    if distances[x, y] == -1 or nd < distances[x, y]:
+                        distances[x, y] = nd
+                        directions[x, y] = from_chars[i]
+                        buckets[nd % (max_cost + 1)].push_back(x * h + y)
+                        pending += 1
+        bucket.clear()
+        d += 1
+
+
+cdef inline int radix_bucket(long long key, long long last) nogil:
+    if key == last:
+        return 0
+    return 64 - clzll(<unsigned long long>(key ^ last))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void flood_radix(const np.int8_t[:, :] maze, const np.int32_t[:, :] costs,
+                      dist_t[:, :] distances, np.int8_t[:, :] directions,
+                      int w, int h) nogil:
+    # Dijkstra with radix heap, for costs too big to have bucket for each
+    cdef int x, y, i, b, cell
+    cdef long long d, nd, last = 0
+    cdef size_t k, pending = 0
+    cdef vector[vector[ritem]] buckets
+    cdef vector[ritem] bucket
+    cdef ritem item
+    buckets.resize(65)
+
+    for x in range(w):
+        for y in range(h):
+            if maze[x, y] < 0:
+                directions[x, y] = b'#'
+            elif maze[x, y] == 1:
+                item.key = 0
+                item.cell = x * h + y
+                buckets[0].push_back(item)
+                distances[x, y] = 0
+                directions[x, y] = b'X'
+                pending += 1
+
+    while pending > 0:
+        if buckets[0].empty():
+            b = 1
+            while buckets[b].empty():
+                b += 1
+            bucket.swap(buckets[b])
+            last = bucket[0].key
+            for k in range(bucket.size()):
+                if bucket[k].key < last:
+                    last = bucket[k].key
+            for k in range(bucket.size()):
+                buckets[radix_bucket(bucket[k].key, last)].push_back(bucket[k])
+            bucket.clear()
+        item = buckets[0].back()
+        buckets[0].pop_back()
+        pending -= 1
+        d = item.key
+        cell = item.cell
+        if distances[cell // h, cell % h] != d:
+            continue  # already reached cheaper
         for i in range(4):
-            offset = dir_offsets[i]
-            x = item.x + offset.x
-            y = item.y + offset.y
-            if 0 <= x < w and 0 <= y < h:
-                if maze[x, y] >= 0 and distances[x, y] == -1:
-                    distances[x, y] = item.distance+1
-                    directions[x, y] = dir_chars[i]
-                    q.push(qitem(x, y, item.distance+1))
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and maze[x, y] >= 0:
+                nd = d + costs[x, y]
+                if distances[x, y] == -1 or nd < distances[x, y]:
+                    distances[x, y] = nd
+                    directions[x, y] = from_chars[i]
+                    item.key = nd
+                    item.cell = x * h + y
+                    buckets[radix_bucket(nd, last)].push_back(item)
+                    pending += 1
 
-    return distances, directions, directions2reachable(directions, w, h)
+
+cpdef weighted_flood(const np.int8_t[:, :] maze, const np.int32_t[:, :] costs, int w, int h):
+    cdef bool reachable
+    cdef int max_cost = 1
+    passable = np.asarray(maze) >= 0
+    if np.any(passable):
+        max_cost = max(np.asarray(costs)[passable].max(), 1)
+        if np.asarray(costs)[passable].min() < 1:
+            raise ValueError('Costs of free cells must be positive.')
+    # widen distances only when the longest possible path would overflow
+    dtype = 'int32' if max_cost * np.count_nonzero(passable) < 2**31 else 'int64'
+    distances = np.full((w, h), -1, dtype=dtype)
+    directions = np.full((w, h), b' ', dtype='S1')
+    cdef np.int8_t[:, :] directions_view = directions.view('int8')
+    cdef np.int32_t[:, :] distances32
+    cdef np.int64_t[:, :] distances64
+    if dtype == 'int32':
+        distances32 = distances
+        with nogil:
+            if max_cost <= DIAL_MAX_COST:
+                flood_dial(maze, costs, distances32, directions_view, w, h, max_cost)
+            else:
+                flood_radix(maze, costs, distances32, directions_view, w, h)
+    else:
+        distances64 = distances
+        with nogil:
+            if max_cost <= DIAL_MAX_COST:
+                flood_dial(maze, costs, distances64, directions_view, w, h, max_cost)
+            else:
+                flood_radix(maze, costs, distances64, directions_view, w, h)
+    with nogil:
+        reachable = directions2reachable(directions_view, w, h)
+    return distances, directions, reachable
 
 
 @cython.boundscheck(False)
@@ -71,33 +405,915 @@ cpdef build_path(np.ndarray[np.int8_t, ndim=2] directions, int row, int column):
     if directions[row, column] == b'#' or directions[row, column] == b' ':
         raise NoPathExistsException
     cdef vector[pair[int,int]] path
-    cdef map[char,coords] dirs
-    dirs.insert(pair[char,coords](b'v', coords(1, 0)))
-    dirs.insert(pair[char,coords](b'^', coords(-1, 0)))
-    dirs.insert(pair[char,coords](b'>', coords(0, 1)))
-    dirs.insert(pair[char,coords](b'<', coords(0, -1)))
+    cdef coords d
     path.push_back(pair[int,int](row, column))
     while directions[row, column] != b'X':
-        d = dirs[directions[row, column]]
+        d = step_offsets[<unsigned char>directions[row, column]]
+        row += d.x
+        column += d.y
+        path.push_back(pair[int,int](row, column))
+    if metrics.enabled:
+        metrics.observe('path_length', path.size())
+    return path
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef int path_length(const np.int8_t[:, :] directions, int row, int column) nogil:
+    # Number of cells on path from given cell, 0 if there is no path
+    cdef int length = 1
+    cdef coords d
+    if directions[row, column] == b'#' or directions[row, column] == b' ':
+        return 0
+    while directions[row, column] != b'X':
+        d = step_offsets[<unsigned char>directions[row, column]]
+        row += d.x
+        column += d.y
+        length += 1
+    return length
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void fill_path(const np.int8_t[:, :] directions, int row, int column,
+                    np.int32_t[:, :] coords_out, int start) nogil:
+    cdef coords d
+    coords_out[start, 0] = row
+    coords_out[start, 1] = column
+    while directions[row, column] != b'X':
+        d = step_offsets[<unsigned char>directions[row, column]]
+        row += d.x
+        column += d.y
+        start += 1
+        coords_out[start, 0] = row
+        coords_out[start, 1] = column
+
+
+cdef check_inside(const np.int8_t[:, :] directions, int row, int column):
+    if not (0 <= row < directions.shape[0] and 0 <= column < directions.shape[1]):
+        raise IndexError('Cell ({}, {}) is outside of the maze.'.format(row, column))
+
+
+cpdef path_array(directions, int row, int column):
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    check_inside(dirs, row, column)
+    cdef int length = path_length(dirs, row, column)
+    if length == 0:
+        raise NoPathExistsException
+    if metrics.enabled:
+        metrics.observe('path_length', length)
+    path = np.empty((length, 2), dtype='int32')
+    fill_path(dirs, row, column, path, 0)
+    return path
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef trace_paths(directions, const np.int32_t[:, :] starts):
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    cdef int i, count = starts.shape[0]
+    for i in range(count):
+        check_inside(dirs, starts[i, 0], starts[i, 1])
+    offsets = np.zeros(count + 1, dtype='int64')
+    cdef np.int64_t[:] offsets_view = offsets
+    with nogil:
+        for i in range(count):
+            offsets_view[i+1] = offsets_view[i] + path_length(dirs, starts[i, 0], starts[i, 1])
+    coords_out = np.empty((offsets_view[count], 2), dtype='int32')
+    cdef np.int32_t[:, :] coords_view = coords_out
+    with nogil:
+        for i in range(count):
+            if offsets_view[i+1] > offsets_view[i]:
+                fill_path(dirs, starts[i, 0], starts[i, 1], coords_view, offsets_view[i])
+    return offsets, coords_out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef union_paths(directions, const np.int32_t[:, :] starts):
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    cdef int w = dirs.shape[0], h = dirs.shape[1]
+    cdef int i, k, cell, running, count = starts.shape[0]
+    cdef coords d
+    cdef vector[np.uint8_t] traced
+    cdef vector[int] cells, segments, joins
+    for i in range(count):
+        check_inside(dirs, starts[i, 0], starts[i, 1])
+    counts = np.zeros((w, h), dtype='int32')
+    cdef np.int32_t[:, :] counts_view = counts
+
+    with nogil:
+        # trace each start only until it joins some already traced path
+        traced.assign(w * h, 0)
+        segments.push_back(0)
+        for i in range(count):
+            cell = starts[i, 0] * h + starts[i, 1]
+            if dirs[starts[i, 0], starts[i, 1]] == b'#' or dirs[starts[i, 0], starts[i, 1]] == b' ':
+                continue  # no path
+            counts_view[starts[i, 0], starts[i, 1]] += 1
+            if traced[cell]:
+                continue
+            while not traced[cell]:
+                traced[cell] = 1
+                cells.push_back(cell)
+                if dirs[cell // h, cell % h] == b'X':
+                    cell = -1
+                    break
+                d = step_offsets[<unsigned char>dirs[cell // h, cell % h]]
+                cell += d.x * h + d.y
+            segments.push_back(cells.size())
+            joins.push_back(cell)
+
+        # later segments flow into earlier ones, so sum them up backwards
+        for k in range(joins.size() - 1, -1, -1):
+            running = 0
+            for i in range(segments[k], segments[k+1]):
+                cell = cells[i]
+                running += counts_view[cell // h, cell % h]
+                counts_view[cell // h, cell % h] = running
+            if joins[k] >= 0:
+                counts_view[joins[k] // h, joins[k] % h] += running
+    return counts
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef path_overlay(directions, const np.int32_t[:, :] starts):
+    # Line bitmasks and arrow codes of all cells on paths from starts
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    cdef int w = dirs.shape[0], h = dirs.shape[1]
+    cdef int i, x, y, count = starts.shape[0]
+    cdef np.int8_t d
+    cdef coords step
+    for i in range(count):
+        check_inside(dirs, starts[i, 0], starts[i, 1])
+    paths = np.zeros((w, h), dtype='int8')
+    arrows = np.zeros((w, h), dtype='int8')
+    cdef np.int8_t[:, :] paths_view = paths
+    cdef np.int8_t[:, :] arrows_view = arrows
+    cdef vector[np.uint8_t] traced
+
+    with nogil:
+        traced.assign(w * h, 0)
+        for i in range(count):
+            x, y = starts[i, 0], starts[i, 1]
+            if dirs[x, y] == b'#' or dirs[x, y] == b' ':
+                continue  # no path
+            while not traced[x * h + y]:  # stop where already traced path joins
+                traced[x * h + y] = 1
+                d = dirs[x, y]
+                if d == b'X':
+                    break
+                step = step_offsets[<unsigned char>d]
+                arrows_view[x, y] = arrow_codes[<unsigned char>d]
+                paths_view[x, y] |= line_bits[<unsigned char>d]
+                x += step.x
+                y += step.y
+                paths_view[x, y] |= entry_bits[<unsigned char>d]
+    return paths, arrows
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef label_goals(directions):
+    # Goals are numbered in row-major order, labels spread down the path tree
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    cdef int w = dirs.shape[0], h = dirs.shape[1]
+    cdef int x, y, i, cell, goal = 0
+    cdef size_t k
+    cdef vector[int] cells
+    labels = np.full((w, h), -1, dtype='int32')
+    cdef np.int32_t[:, :] labels_view = labels
+    with nogil:
+        for x in range(w):
+            for y in range(h):
+                if dirs[x, y] == b'X':
+                    labels_view[x, y] = goal
+                    goal += 1
+                    cells.push_back(x * h + y)
+        k = 0
+        while k < cells.size():
+            cell = cells[k]
+            k += 1
+            for i in range(4):
+                x = cell // h + neighbor_offsets[i].x
+                y = cell % h + neighbor_offsets[i].y
+                if 0 <= x < w and 0 <= y < h and dirs[x, y] == from_chars[i]:
+                    labels_view[x, y] = labels_view[cell // h, cell % h]
+                    cells.push_back(x * h + y)
+    return labels
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void flood_goal_bits(const np.int8_t[:, :] dirs, const np.int32_t[:] goals,
+                          int first, int count, np.int32_t[:, :, :] out, int w, int h) nogil:
+    # Multi-source BFS for up to 64 goals at once, bit j of a cell mask
+    # says whether goal first+j has already reached the cell
+    cdef int x, y, i, j, cell, level = 0
+    cdef uint64_t found
+    cdef vector[uint64_t] seen, frontier, reached
+    cdef vector[int] active, next_active
+    seen.assign(w * h, 0)
+    frontier.assign(w * h, 0)
+    reached.assign(w * h, 0)
+
+    for j in range(count):
+        cell = goals[first + j]
+        if frontier[cell] == 0:
+            active.push_back(cell)
+        seen[cell] |= (<uint64_t>1) << j
+        frontier[cell] |= (<uint64_t>1) << j
+        out[first + j, cell // h, cell % h] = 0
+
+    while not active.empty():
+        level += 1
+        next_active.clear()
+        for cell in active:
+            for i in range(4):
+                x = cell // h + neighbor_offsets[i].x
+                y = cell % h + neighbor_offsets[i].y
+                if 0 <= x < w and 0 <= y < h and dirs[x, y] != b'#':
+                    found = frontier[cell] & ~seen[x * h + y]
+                    if found:
+                        if reached[x * h + y] == 0:
+                            next_active.push_back(x * h + y)
+                        reached[x * h + y] |= found
+        for cell in active:
+            frontier[cell] = 0
+        for cell in next_active:
+            found = reached[cell]
+            reached[cell] = 0
+            seen[cell] |= found
+            frontier[cell] = found
+            while found:
+                j = ctzll(found)
+                found &= found - 1
+                out[first + j, cell // h, cell % h] = level
+        active.swap(next_active)
+
+
+cpdef goal_distances(directions, int k):
+    cdef const np.int8_t[:, :] dirs = directions.view('int8')
+    cdef int w = dirs.shape[0], h = dirs.shape[1]
+    cdef int first
+    goals = np.flatnonzero(np.asarray(directions) == b'X').astype('int32')
+    if not 0 <= k <= len(goals):
+        raise ValueError('Maze has {} goals, cannot use {}.'.format(len(goals), k))
+    out = np.full((k, w, h), -1, dtype='int32')
+    cdef const np.int32_t[:] goals_view = goals
+    cdef np.int32_t[:, :, :] out_view = out
+    with nogil:
+        for first in range(0, k, 64):
+            flood_goal_bits(dirs, goals_view, first, min(64, k - first), out_view, w, h)
+    return out
+
+
+def weighted_goal_distances(directions, costs, int k):
+    # bit-parallel BFS counts unit steps, so costs need one flood per goal
+    goals = np.argwhere(np.asarray(directions) == b'X')
+    if not 0 <= k <= len(goals):
+        raise ValueError('Maze has {} goals, cannot use {}.'.format(len(goals), k))
+    maze = np.where(np.asarray(directions) == b'#', -1, 0).astype('int8')
+    out = np.full((k,) + maze.shape, -1, dtype='int32')
+    for j, (row, column) in enumerate(goals[:k].tolist()):
+        maze[row, column] = 1  # other goals are just free cells
+        distances = weighted_flood(maze, costs, *maze.shape)[0]
+        if distances.dtype != out.dtype:
+            out = out.astype(distances.dtype)
+        out[j] = distances
+        maze[row, column] = 0
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void settle_directions(np.int32_t[:, :] distances, np.int8_t[:, :] directions,
+                            vector[int] &cells, int w, int h) noexcept nogil:
+    # Repaired cells and their neighbors point to the parent a fresh flood
+    # would pick, the one with the lowest rank among those one step closer
+    cdef int x, y, px, py, i, j, cell
+    for cell in cells:
+        for j in range(5):
+            x = cell // h + (neighbor_offsets[j].x if j < 4 else 0)
+            y = cell % h + (neighbor_offsets[j].y if j < 4 else 0)
+            if not (0 <= x < w and 0 <= y < h) or distances[x, y] <= 0:
+                continue
+            for i in range(4):
+                px = x - neighbor_offsets[i].x
+                py = y - neighbor_offsets[i].y
+                if 0 <= px < w and 0 <= py < h and distances[px, py] == distances[x, y] - 1:
+                    directions[x, y] = from_chars[i]
+                    break
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef int close_cell(np.ndarray[np.int32_t, ndim=2] distances,
+                     np.ndarray[np.int8_t, ndim=2] directions, int row, int column):
+    # Repairs analysis after cell became wall, returns change of unreachable count
+    cdef int w = directions.shape[0], h = directions.shape[1]
+    cdef int x, y, i, cell, d
+    cdef int unreachable = 0
+    cdef vector[int] subtree
+    cdef priority_queue[pair[int,int]] pq
+    cdef size_t k
+    if directions[row, column] == b'#':
+        return 0
+    if directions[row, column] == b' ':
+        directions[row, column] = b'#'
+        return -1
+
+    # cells whose shortest path led via this cell lose their distance
+    subtree.push_back(row * h + column)
+    k = 0
+    while k < subtree.size():
+        cell = subtree[k]
+        k += 1
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and directions[x, y] == from_chars[i]:
+                directions[x, y] = b' '
+                distances[x, y] = -1
+                subtree.push_back(x * h + y)
+    directions[row, column] = b'#'
+    distances[row, column] = -1
+
+    # reconnect them from the untouched border of the subtree
+    for k in range(1, subtree.size()):
+        cell = subtree[k]
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and distances[x, y] >= 0:
+                d = distances[x, y] + 1
+                if distances[cell // h, cell % h] == -1 or d < distances[cell // h, cell % h]:
+                    distances[cell // h, cell % h] = d
+                    directions[cell // h, cell % h] = to_chars[i]
+        if distances[cell // h, cell % h] >= 0:
+            pq.push(pair[int,int](-distances[cell // h, cell % h], cell))
+
+    while not pq.empty():
+        d = -pq.top().first
+        cell = pq.top().second
+        pq.pop()
+        if d != distances[cell // h, cell % h]:
+            continue  # already improved
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and directions[x, y] != b'#':
+                if distances[x, y] == -1 or distances[x, y] > d + 1:
+                    distances[x, y] = d + 1
+                    directions[x, y] = from_chars[i]
+                    pq.push(pair[int,int](-d - 1, x * h + y))
+    settle_directions(distances, directions, subtree, w, h)
+
+    for k in range(1, subtree.size()):
+        cell = subtree[k]
+        if distances[cell // h, cell % h] == -1:
+            unreachable += 1
+    return unreachable
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef int open_cell(np.ndarray[np.int32_t, ndim=2] distances,
+                    np.ndarray[np.int8_t, ndim=2] directions, int row, int column):
+    # Repairs analysis after wall became free cell, returns change of unreachable count
+    cdef int w = directions.shape[0], h = directions.shape[1]
+    cdef int x, y, i, cell
+    cdef int unreachable = 0
+    cdef queue[int] q
+    cdef vector[int] improved
+    if directions[row, column] != b'#':
+        return 0
+    directions[row, column] = b' '
+    for i in range(4):
+        x = row + neighbor_offsets[i].x
+        y = column + neighbor_offsets[i].y
+        if 0 <= x < w and 0 <= y < h and distances[x, y] >= 0:
+            if distances[row, column] == -1 or distances[x, y] + 1 < distances[row, column]:
+                distances[row, column] = distances[x, y] + 1
+                directions[row, column] = to_chars[i]
+    if distances[row, column] == -1:
+        return 1  # isolated from goals, nothing to improve
+
+    q.push(row * h + column)
+    while not q.empty():
+        cell = q.front()
+        q.pop()
+        improved.push_back(cell)
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and directions[x, y] != b'#':
+                if distances[x, y] == -1 or distances[x, y] > distances[cell // h, cell % h] + 1:
+                    if distances[x, y] == -1:
+                        unreachable -= 1
+                    distances[x, y] = distances[cell // h, cell % h] + 1
+                    directions[x, y] = from_chars[i]
+                    q.push(x * h + y)
+    settle_directions(distances, directions, improved, w, h)
+    return unreachable
+
+
+cdef inline int get_code(np.uint8_t *codes, int cw, int x, int y) noexcept nogil:
+    return (codes[x * cw + (y >> 2)] >> ((y & 3) << 1)) & 3
+
+
+cdef inline void set_code(np.uint8_t *codes, int cw, int x, int y, int code) noexcept nogil:
+    cdef int shift = (y & 3) << 1
+    codes[x * cw + (y >> 2)] = (codes[x * cw + (y >> 2)] & ~(3 << shift)) | (code << shift)
+
+
+cdef inline bool get_bit(np.uint8_t *bits, int bw, int x, int y) noexcept nogil:
+    return (bits[x * bw + (y >> 3)] >> (y & 7)) & 1
+
+
+cdef inline void set_bit(np.uint8_t *bits, int bw, int x, int y, bool value) noexcept nogil:
+    if value:
+        bits[x * bw + (y >> 3)] |= 1 << (y & 7)
+    else:
+        bits[x * bw + (y >> 3)] &= ~(1 << (y & 7))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bool flood_compact(const np.int8_t[:, :] maze, np.uint8_t *codes, np.uint8_t *special,
+                        np.uint8_t *frontier_bits, int w, int h) nogil:
+    # Level-synchronous BFS that keeps only 2-bit codes and special bitmap,
+    # frontier bitmap tells which neighbor is parent with the lowest rank
+    cdef int x, y, i, j, cell, unvisited = 0
+    cdef int cw = (h + 3) // 4, bw = (h + 7) // 8
+    cdef vector[int] frontier, next_frontier
+    for x in range(w):
+        for y in range(h):
+            if maze[x, y] < 0:
+                set_code(codes, cw, x, y, CODE_WALL)
+            elif maze[x, y] == 1:
+                set_code(codes, cw, x, y, CODE_GOAL)
+                set_bit(frontier_bits, bw, x, y, True)
+                frontier.push_back(x * h + y)
+            else:
+                unvisited += 1
+
+    while not frontier.empty():
+        next_frontier.clear()
+        for cell in frontier:
+            for i in range(4):
+                x = cell // h + neighbor_offsets[i].x
+                y = cell % h + neighbor_offsets[i].y
+                if 0 <= x < w and 0 <= y < h and get_bit(special, bw, x, y) and \
+                   get_code(codes, cw, x, y) == CODE_NONE:
+                    for j in range(4):
+                        if 0 <= x - neighbor_offsets[j].x < w and 0 <= y - neighbor_offsets[j].y < h and \
+                           get_bit(frontier_bits, bw, x - neighbor_offsets[j].x, y - neighbor_offsets[j].y):
+                            break
+                    set_bit(special, bw, x, y, False)
+                    set_code(codes, cw, x, y, j)
+                    next_frontier.push_back(x * h + y)
+                    unvisited -= 1
+        for cell in frontier:
+            set_bit(frontier_bits, bw, cell // h, cell % h, False)
+        for cell in next_frontier:
+            set_bit(frontier_bits, bw, cell // h, cell % h, True)
+        frontier.swap(next_frontier)
+    return unvisited == 0
+
+
+cpdef compact_flood(const np.int8_t[:, :] maze, int w, int h):
+    cdef bool reachable
+    codes = np.full((w, (h + 3) // 4), 0b10101010, dtype='uint8')  # all CODE_NONE
+    special = np.full((w, (h + 7) // 8), 0xFF, dtype='uint8')
+    frontier_bits = np.zeros((w, (h + 7) // 8), dtype='uint8')
+    cdef np.uint8_t[:, ::1] codes_view = codes
+    cdef np.uint8_t[:, ::1] special_view = special
+    cdef np.uint8_t[:, ::1] frontier_view = frontier_bits
+    if w == 0 or h == 0:
+        return codes, special, True
+    cdef np.uint8_t *codes_ptr = &codes_view[0, 0]
+    cdef np.uint8_t *special_ptr = &special_view[0, 0]
+    cdef np.uint8_t *frontier_ptr = &frontier_view[0, 0]
+    with nogil:
+        reachable = flood_compact(maze, codes_ptr, special_ptr, frontier_ptr, w, h)
+    return codes, special, reachable
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void fill_compact_distances(np.uint8_t *codes, np.uint8_t *special,
+                                 narrow_t[:, :] distances, int w, int h) nogil:
+    cdef int x, y, i, cell
+    cdef int cw = (h + 3) // 4, bw = (h + 7) // 8
+    cdef size_t k = 0
+    cdef vector[int] cells
+    for x in range(w):
+        for y in range(h):
+            if get_bit(special, bw, x, y) and get_code(codes, cw, x, y) == CODE_GOAL:
+                distances[x, y] = 0
+                cells.push_back(x * h + y)
+    while k < cells.size():
+        cell = cells[k]
+        k += 1
+        for i in range(4):
+            x = cell // h + neighbor_offsets[i].x
+            y = cell % h + neighbor_offsets[i].y
+            if 0 <= x < w and 0 <= y < h and not get_bit(special, bw, x, y) and \
+               get_code(codes, cw, x, y) == i:
+                distances[x, y] = distances[cell // h, cell % h] + 1
+                cells.push_back(x * h + y)
+
+
+cpdef compact_distances(codes, special, int w, int h):
+    # the longest path cannot be longer than number of cells
+    dtype = np.min_scalar_type(-max(w * h, 1))
+    if dtype == np.int64:
+        raise ValueError('Maze is too big for compact analysis.')
+    distances = np.full((w, h), -1, dtype=dtype)
+    if w == 0 or h == 0:
+        return distances
+    cdef np.uint8_t[:, ::1] codes_view = codes
+    cdef np.uint8_t[:, ::1] special_view = special
+    cdef np.uint8_t *codes_ptr = &codes_view[0, 0]
+    cdef np.uint8_t *special_ptr = &special_view[0, 0]
+    cdef np.int8_t[:, :] distances8
+    cdef np.int16_t[:, :] distances16
+    cdef np.int32_t[:, :] distances32
+    if dtype == np.int8:
+        distances8 = distances
+        with nogil:
+            fill_compact_distances(codes_ptr, special_ptr, distances8, w, h)
+    elif dtype == np.int16:
+        distances16 = distances
+        with nogil:
+            fill_compact_distances(codes_ptr, special_ptr, distances16, w, h)
+    else:
+        distances32 = distances
+        with nogil:
+            fill_compact_distances(codes_ptr, special_ptr, distances32, w, h)
+    return distances
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef compact_directions(codes, special, int w, int h):
+    cdef np.int8_t *special_chars = [b'#', b'X', b' ', b' ']
+    cdef int x, y
+    cdef int cw = (h + 3) // 4, bw = (h + 7) // 8
+    directions = np.empty((w, h), dtype='S1')
+    if w == 0 or h == 0:
+        return directions
+    cdef np.int8_t[:, :] directions_view = directions.view('int8')
+    cdef np.uint8_t[:, ::1] codes_view = codes
+    cdef np.uint8_t[:, ::1] special_view = special
+    cdef np.uint8_t *codes_ptr = &codes_view[0, 0]
+    cdef np.uint8_t *special_ptr = &special_view[0, 0]
+    with nogil:
+        for x in range(w):
+            for y in range(h):
+                if get_bit(special_ptr, bw, x, y):
+                    directions_view[x, y] = special_chars[get_code(codes_ptr, cw, x, y)]
+                else:
+                    directions_view[x, y] = from_chars[get_code(codes_ptr, cw, x, y)]
+    return directions
+
+
+cpdef compact_path(codes, special, int w, int h, int row, int column):
+    cdef int cw = (h + 3) // 4, bw = (h + 7) // 8
+    cdef coords d
+    if not (0 <= row < w and 0 <= column < h):
+        raise IndexError('Cell ({}, {}) is outside of the maze.'.format(row, column))
+    cdef np.uint8_t[:, ::1] codes_view = codes
+    cdef np.uint8_t[:, ::1] special_view = special
+    cdef np.uint8_t *codes_ptr = &codes_view[0, 0]
+    cdef np.uint8_t *special_ptr = &special_view[0, 0]
+    if get_bit(special_ptr, bw, row, column) and get_code(codes_ptr, cw, row, column) != CODE_GOAL:
+        raise NoPathExistsException
+    cdef vector[pair[int,int]] path
+    path.push_back(pair[int,int](row, column))
+    while not get_bit(special_ptr, bw, row, column):
+        d = step_offsets[<unsigned char>from_chars[get_code(codes_ptr, cw, row, column)]]
         row += d.x
         column += d.y
         path.push_back(pair[int,int](row, column))
     return path
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef relax_tile(const np.int8_t[:, :] maze, np.int32_t[:, :] distances,
+                 np.int8_t[:, :] directions, const np.int32_t[:, :] seeds):
+    # BFS inside one tile from seeds (row, column, distance, direction) sorted
+    # by distance, returns whether tile changed and seeds for neighbor tiles
+    # (with coordinates just outside of this tile)
+    cdef int w = maze.shape[0], h = maze.shape[1]
+    cdef int x, y, i, d, cell
+    cdef size_t k = 0, count = seeds.shape[0]
+    cdef bool changed = False
+    cdef queue[int] q
+    cdef vector[int] outgoing
+    with nogil:
+        while k < count or not q.empty():
+            if k < count and (q.empty() or seeds[k, 2] <= distances[q.front() // h, q.front() % h]):
+                x, y, d = seeds[k, 0], seeds[k, 1], seeds[k, 2]
+                k += 1
+                if maze[x, y] < 0 or (0 <= distances[x, y] <= d):
+                    continue
+                distances[x, y] = d
+                directions[x, y] = seeds[k-1, 3]
+                changed = True
+                q.push(x * h + y)
+                continue
+            cell = q.front()
+            q.pop()
+            d = distances[cell // h, cell % h] + 1
+            for i in range(4):
+                x = cell // h + neighbor_offsets[i].x
+                y = cell % h + neighbor_offsets[i].y
+                if 0 <= x < w and 0 <= y < h:
+                    if maze[x, y] >= 0 and (distances[x, y] == -1 or distances[x, y] > d):
+                        distances[x, y] = d
+                        directions[x, y] = from_chars[i]
+                        q.push(x * h + y)
+                else:
+                    outgoing.push_back(x)
+                    outgoing.push_back(y)
+                    outgoing.push_back(d)
+                    outgoing.push_back(from_chars[i])
+    result = np.empty((outgoing.size() // 4, 4), dtype='int32')
+    cdef np.int32_t[:, :] result_view = result
+    for k in range(outgoing.size()):
+        result_view[k // 4, k % 4] = outgoing[k]
+    return changed, result
+
+
+def map_rows(path, dtype, shape, first, last, mode='r+', offset=0):
+    # Maps just rows first..last-1 so that pages of other rows are released
+    itemsize = np.dtype(dtype).itemsize
+    return np.memmap(path, dtype=dtype, mode=mode, shape=(last - first, shape[1]),
+                     offset=offset + first * shape[1] * itemsize)
+
+
+def analyze_file(path, shape, out_dir, tile=1024, offset=0, resident=16):
+    # Analyzes maze stored as raw int8 grid in file (too big for memory),
+    # distances and directions are written to files in out_dir. Maze is
+    # processed by square tiles: tile runs BFS from seeds that came from its
+    # neighbors and sends seeds over its border, tile with the lowest pending
+    # distance goes first. At most `resident` tiles are kept in memory, the
+    # least recently used one is written back to the files. A tile is run
+    # again whenever shortest paths cross back into it, so mazes whose paths
+    # wind between tiles farther apart than `resident` (e.g. serpentine
+    # corridors through more tiles than that) reload a whole tile for each
+    # crossing, up to about tile/2 times per tile.
+    rows, columns = shape
+    tiles = ((rows + tile - 1) // tile, (columns + tile - 1) // tile)
+    os.makedirs(out_dir, exist_ok=True)
+    files = {
+        'maze': (path, 'int8'),
+        'distances': (os.path.join(out_dir, 'distances.int32'), 'int32'),
+        'directions': (os.path.join(out_dir, 'directions.S1'), 'S1'),
+    }
+    for name in ('distances', 'directions'):
+        np.memmap(files[name][0], dtype=files[name][1], mode='w+', shape=shape).flush()
+    cache = collections.OrderedDict()  # (ti, tj) -> [maze, distances, directions, changed]
+
+    def read_tile(ti, tj):
+        first, last = ti * tile, min((ti + 1) * tile, rows)
+        left, right = tj * tile, min((tj + 1) * tile, columns)
+        maze = map_rows(*files['maze'], shape, first, last, 'r', offset)
+        maze_tile = np.array(maze[:, left:right])
+        del maze
+        if (ti, tj) in visited:
+            distances = map_rows(*files['distances'], shape, first, last, 'r')
+            directions = map_rows(*files['directions'], shape, first, last, 'r')
+            tile_arrays = [maze_tile, np.array(distances[:, left:right]),
+                           np.array(directions[:, left:right]), False]
+            del distances, directions
+            return tile_arrays
+        visited.add((ti, tj))  # first visit initializes tile
+        return [maze_tile, np.full(maze_tile.shape, -1, dtype='int32'),
+                np.where(maze_tile < 0, b'#', b' ').astype('S1'), True]
+
+    def write_tile(ti, tj, tile_arrays):
+        if not tile_arrays[3]:
+            return
+        first, last = ti * tile, min((ti + 1) * tile, rows)
+        left, right = tj * tile, min((tj + 1) * tile, columns)
+        distances = map_rows(*files['distances'], shape, first, last)
+        directions = map_rows(*files['directions'], shape, first, last)
+        distances[:, left:right] = tile_arrays[1]
+        directions[:, left:right] = tile_arrays[2]
+        del distances, directions  # shared mapping, read back without flush
+
+    def process(ti, tj, seeds):
+        tile_arrays = cache.pop((ti, tj), None)
+        if tile_arrays is None:
+            tile_arrays = read_tile(ti, tj)
+        cache[ti, tj] = tile_arrays
+        if len(cache) > resident:
+            (oldest_i, oldest_j), oldest = cache.popitem(last=False)
+            write_tile(oldest_i, oldest_j, oldest)
+        maze_tile, distances_tile, directions_tile = tile_arrays[:3]
+        if seeds is None:  # seed goals
+            goals = np.argwhere(maze_tile == 1).astype('int32')
+            seeds = np.zeros((len(goals), 4), dtype='int32')
+            seeds[:, :2] = goals
+            seeds[:, 3] = ord(b'X')
+        else:
+            seeds = seeds[np.argsort(seeds[:, 2], kind='stable')]
+        changed, outgoing = relax_tile(maze_tile, distances_tile, directions_tile.view('int8'), seeds)
+        tile_arrays[3] = tile_arrays[3] or changed
+        outgoing[:, 0] += ti * tile
+        outgoing[:, 1] += tj * tile
+        return outgoing
+
+    visited = set()
+    pending = {}
+    heap = []
+
+    def send(outgoing):
+        inside = (outgoing[:, 0] >= 0) & (outgoing[:, 0] < rows) & \
+                 (outgoing[:, 1] >= 0) & (outgoing[:, 1] < columns)
+        outgoing = outgoing[inside]
+        targets = (outgoing[:, 0] // tile) * tiles[1] + outgoing[:, 1] // tile
+        for target in np.unique(targets):
+            seeds = outgoing[targets == target]
+            ti, tj = divmod(int(target), tiles[1])
+            seeds[:, 0] -= ti * tile
+            seeds[:, 1] -= tj * tile
+            pending.setdefault((ti, tj), []).append(seeds)
+            heapq.heappush(heap, (int(seeds[:, 2].min()), ti, tj))
+
+    for ti in range(tiles[0]):
+        for tj in range(tiles[1]):
+            send(process(ti, tj, None))
+    while heap:
+        _, ti, tj = heapq.heappop(heap)
+        if (ti, tj) in pending:
+            send(process(ti, tj, np.concatenate(pending.pop((ti, tj)))))
+    for (ti, tj), tile_arrays in cache.items():
+        write_tile(ti, tj, tile_arrays)
+
+    is_reachable = True
+    for first in range(0, rows, tile):
+        directions = map_rows(*files['directions'], shape, first, min(first + tile, rows), 'r')
+        is_reachable = is_reachable and not np.any(directions == b' ')
+        del directions
+    distances = np.memmap(files['distances'][0], dtype='int32', mode='r+', shape=shape)
+    directions = np.memmap(files['directions'][0], dtype='S1', mode='r+', shape=shape)
+    distances.flush()  # tiles were written back through other mappings
+    directions.flush()
+    return MazeAnalysis.from_arrays(distances, directions, is_reachable)
+
+
 cdef class NoPathExistsException(Exception):
     pass
 
 
 class MazeAnalysis:
+    version = 0  # incremented when walls change, for caches of derived data
 
-    def __init__(self, maze):
-        maze = np.atleast_2d(maze.astype('int8')) # fix matrix type & dims
-        self.distances, self.directions, self.is_reachable = flood(maze, *maze.shape)
+    def __init__(self, maze, engine='auto', weighted=False, costs=None, out=None):
+        values = np.atleast_2d(np.asarray(maze))
+        maze = as_maze(values)
+        if weighted and out is not None:
+            raise ValueError('Weighted analysis cannot fill given arrays.')
+        if weighted:
+            if costs is None:
+                costs = np.maximum(values, 1)  # free cell 0 costs as much as 1
+            costs = np.clip(np.atleast_2d(costs), 0, 2**31 - 1).astype('int32')
+            if costs.shape != maze.shape:
+                raise ValueError('Costs must have the same shape as maze.')
+            self._setup(*weighted_flood(maze, costs, *maze.shape), costs)
+        else:
+            self._setup(*flood(maze, *maze.shape, engine, *(out or ())))
+
+    @classmethod
+    def from_arrays(cls, distances, directions, is_reachable):
+        analysis = cls.__new__(cls)
+        analysis._setup(distances, directions, is_reachable)
+        return analysis
 
-    def path(self, row, column):
+    def _setup(self, distances, directions, is_reachable, costs=None):
+        self.distances = distances
+        self.directions = directions
+        self.is_reachable = is_reachable
+        self._costs = costs
+        self._unreachable = None
+        self._goal_id = None
+
+    @property
+    def goal_id(self):
+        if self._goal_id is None:
+            self._goal_id = label_goals(self.directions)
+        return self._goal_id
+
+    def distances_per_goal(self, k=None):
+        if k is None:
+            k = np.count_nonzero(self.directions == b'X')
+        if self._costs is not None:
+            return weighted_goal_distances(self.directions, self._costs, k)
+        return goal_distances(self.directions, k)
+
+    def path(self, row, column, as_array=False):
+        if as_array:
+            return path_array(self.directions, row, column)
         return build_path(self.directions, row, column)
 
+    def paths(self, starts):
+        starts = np.asarray(starts, dtype='int32').reshape(-1, 2)
+        return trace_paths(self.directions, starts)
+
+    def path_union(self, starts):
+        starts = np.asarray(starts, dtype='int32').reshape(-1, 2)
+        return union_paths(self.directions, starts)
+
+    def add_wall(self, row, column):
+        self.version += 1
+        if self._costs is not None:
+            return self._reflood(row, column, -1)
+        return self._repair(close_cell(self.distances, self.directions, row, column))
+
+    def remove_wall(self, row, column):
+        self.version += 1
+        if self._costs is not None:
+            return self._reflood(row, column, 0)
+        return self._repair(open_cell(self.distances, self.directions, row, column))
+
+    def _reflood(self, row, column, value):
+        # repairs assume unit steps, weighted maze is flooded again
+        if (self.directions[row, column] == b'#') == (value < 0):
+            return False
+        maze = np.where(self.directions == b'#', -1, 0).astype('int8')
+        maze[self.directions == b'X'] = 1
+        maze[row, column] = value
+        distances, directions, is_reachable = weighted_flood(maze, self._costs, *maze.shape)
+        self._goal_id = None
+        self.distances[...] = distances
+        self.directions[...] = directions
+        was_reachable = self.is_reachable
+        self.is_reachable = is_reachable
+        return was_reachable != is_reachable
+
+    def _repair(self, unreachable_change):
+        self._goal_id = None
+        if self._unreachable is None:
+            if self.is_reachable:
+                self._unreachable = 0
+            else:
+                self._unreachable = np.count_nonzero(self.directions == b' ')
+                self._unreachable -= unreachable_change  # already repaired
+        self._unreachable += unreachable_change
+        was_reachable = self.is_reachable
+        self.is_reachable = self._unreachable == 0
+        return was_reachable != self.is_reachable
+
+
+class CompactMazeAnalysis:
+    version = 0  # walls never change
+
+    def __init__(self, maze):
+        maze = as_maze(maze)
+        self.shape = maze.shape
+        self.codes, self.special, self.is_reachable = compact_flood(maze, *maze.shape)
+        self._distances = None
+        self._directions = None
+
+    @property
+    def distances(self):
+        if self._distances is None:
+            self._distances = compact_distances(self.codes, self.special, *self.shape)
+        return self._distances
+
+    @property
+    def directions(self):
+        if self._directions is None:
+            self._directions = compact_directions(self.codes, self.special, *self.shape)
+        return self._directions
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.special.nbytes
+
+    def path(self, row, column, as_array=False):
+        path = compact_path(self.codes, self.special, *self.shape, row, column)
+        if as_array:
+            return np.array(path, dtype='int32').reshape(-1, 2)
+        return path
+
+
+cpdef analyze(maze, engine='auto', weighted=False, costs=None, compact=False, out=None):
+    if compact:
+        if weighted:
+            raise ValueError('Compact analysis cannot be weighted.')
+        if out is not None:
+            raise ValueError('Compact analysis cannot fill given arrays.')
+        return CompactMazeAnalysis(maze)
+    return MazeAnalysis(maze, engine, weighted, costs, out)
+
 
-cpdef analyze(maze):
-    return MazeAnalysis(maze)
+def analyze_many(mazes, workers=None):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze, mazes))
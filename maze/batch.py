@@ -0,0 +1,276 @@
+import numpy as np
+from .actors import (SpeedyActor, AcceleratorActor, JumperActor,
+                     TeleporterActor, ScatterbrainActor)
+from .teleport import TeleportSampler
+
+# Batch engine: all actors of a game live in NumPy arrays and are advanced
+# together by ActorBatch.advance(now), once per frame, instead of by one
+# coroutine per actor waking up once per pixel. The behaviors are those
+# of the actor classes, with two differences:
+# * a move ends exactly after its duration (coroutines overshoot it by up
+#   to one sleep), so timing does not depend on the frame rate,
+# * random numbers come from one NumPy generator, games are reproducible
+#   by seed but differ from games of coroutine actors with the same seed.
+
+TYPES = ['basic', 'speedy', 'accelerator', 'jumper', 'teleporter', 'scatterbrain']
+BASIC, SPEEDY, ACCELERATOR, JUMPER, TELEPORTER, SCATTERBRAIN = range(len(TYPES))
+
+STEP, HOP, JUMP_OVER, SHIVER_OUT, SHIVER_IN = range(5)  # current move
+STEP_DURATION = 1.0  # Actor.step
+HOP_DURATION = 0.2  # Actor.jump, in place when there is no direction
+SHIVER_AMPLITUDE = 0.25
+
+# direction char -> row/column difference of a step, '?' for none
+MOVES = b'v>^<'
+DR = np.zeros(256, dtype=np.int64)
+DC = np.zeros(256, dtype=np.int64)
+for char, dr, dc in zip(MOVES, (1, 0, -1, 0), (0, 1, 0, -1)):
+    DR[char] = dr
+    DC[char] = dc
+HAS_MOVE = (DR != 0) | (DC != 0)
+MOVE_CHARS = np.frombuffer(MOVES, dtype=np.uint8)
+JUMPS_OVER = np.array(JumperActor.D2)
+GOAL = ord('X')
+OUTSIDE = ord('?')
+
+
+class BatchActor:
+    """View of one actor of the batch, quacks like ``Actor`` for the GUI"""
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+        self.kind = batch.kind[index]
+
+    @property
+    def row(self):
+        return self.batch.row[self.index]
+
+    @property
+    def column(self):
+        return self.batch.column[self.index]
+
+    @property
+    def score(self):
+        return self.batch.score[self.index]
+
+    @property
+    def in_goal(self):
+        return self.batch.in_goal[self.index]
+
+    @property
+    def task(self):
+        return self.batch.task
+
+
+class ActorBatch:
+    """Actors of one game as arrays indexed by actor
+
+    :param analysis: analysis of the maze, its current directions and
+                     distances are read on each decision (walls may change)
+    :param rows, columns: start cells
+    :param kinds: maze values of the dudes (for drawing)
+    :param types: actor type names (keys of ``actors.actor_types``)
+    :param seed: seed of the random number generator
+    """
+
+    def __init__(self, analysis, rows, columns, kinds, types, seed=None):
+        self.analysis = analysis
+        self.random = np.random.RandomState(seed)
+        self.type = np.array([TYPES.index(t) for t in types], dtype=np.int8)
+        n = len(self.type)
+        self.kind = np.asarray(kinds)
+        self.row = np.array(rows, dtype=np.float64)
+        self.column = np.array(columns, dtype=np.float64)
+        self.prev_row = self.row.copy()
+        self.prev_column = self.column.copy()
+        self.start_row = np.array(rows, dtype=np.int64)  # cell the move started in
+        self.start_column = np.array(columns, dtype=np.int64)
+        self.target_row = self.start_row.copy()  # of teleport
+        self.target_column = self.start_column.copy()
+        self.dr = np.zeros(n, dtype=np.int64)
+        self.dc = np.zeros(n, dtype=np.int64)
+        self.mode = np.full(n, HOP, dtype=np.int8)
+        self.t0 = np.zeros(n)
+        self.duration = np.zeros(n)  # first decision right at the start
+        self.speed_factor = np.ones(n)
+        self.speed_factor[self.type == SPEEDY] = SpeedyActor.SPEED_FACTOR
+        self.steps_without_jump = np.zeros(n, dtype=np.int64)
+        self.in_goal = np.zeros(n, dtype=bool)
+        self.arrival = np.full(n, np.nan)
+        self.score = np.zeros(n)
+        self.now = 0.0
+        self.task = None
+        self.actors = [BatchActor(self, i) for i in range(n)]
+
+    def __len__(self):
+        return len(self.type)
+
+    def stop(self, index):
+        # actors stay in their cells for good (e.g. arrived ones)
+        self._set_moves(index, self.t0[index], HOP, 0, 0, np.inf)
+
+    def next_decision(self):
+        # time when the first of the current moves ends
+        return (self.t0 + self.duration).min()
+
+    def advance(self, now, positions=True):
+        """Advance all actors to time ``now`` (seconds from the start)
+        Without ``positions`` only decisions are made, row and column of
+        actors (for drawing) are left as they were.
+        """
+        self.now = now
+        while True:
+            ended = np.flatnonzero(self.t0 + self.duration <= now)
+            if len(ended) == 0:
+                break
+            self._end_moves(ended)
+        if positions:
+            self.prev_row, self.row = self.row, self.prev_row
+            self.prev_column, self.column = self.column, self.prev_column
+            self._interpolate(now)
+        # score is time spent in the maze (until arrival)
+        np.copyto(self.score, np.where(np.isnan(self.arrival), now, self.arrival))
+
+    def _end_moves(self, ended):
+        t = self.t0[ended] + self.duration[ended]
+        mode = self.mode[ended]
+        moved = (mode == STEP) | (mode == JUMP_OVER)
+        self.start_row[ended] += self.dr[ended] * moved
+        self.start_column[ended] += self.dc[ended] * moved
+        out = mode == SHIVER_OUT
+        if out.any():  # teleport and shiver again
+            teleported = ended[out]
+            self.start_row[teleported] = self.target_row[teleported]
+            self.start_column[teleported] = self.target_column[teleported]
+            self._set_moves(teleported, t[out], SHIVER_IN, 0, 0, TeleporterActor.SHIVER_DURATION)
+            ended, t = ended[~out], t[~out]
+        if len(ended):
+            self._decide(ended, t)
+
+    def _set_moves(self, index, t, mode, dr, dc, duration):
+        self.t0[index] = t
+        self.mode[index] = mode
+        self.dr[index] = dr
+        self.dc[index] = dc
+        self.duration[index] = duration
+
+    def _decide(self, index, t):
+        # next move of actors standing in cells, as Actor.behavior
+        directions = self.analysis.directions.view(np.uint8)
+        distances = self.analysis.distances
+        rows = self.start_row[index]
+        cols = self.start_column[index]
+        inside = (0 <= rows) & (rows < directions.shape[0]) & (0 <= cols) & (cols < directions.shape[1])
+        chars = np.full(len(index), OUTSIDE, dtype=np.uint8)
+        chars[inside] = directions[rows[inside], cols[inside]]
+        types = self.type[index]
+
+        in_goal = chars == GOAL
+        self.in_goal[index] = in_goal
+        arrived = index[in_goal & np.isnan(self.arrival[index])]
+        self.arrival[arrived] = t[in_goal & np.isnan(self.arrival[index])]
+
+        scatter = (types == SCATTERBRAIN) & (self.random.random_sample(len(index)) < ScatterbrainActor.MESS_UP_PROB)
+        if scatter.any():
+            chars[scatter] = self._mess_up(rows[scatter], cols[scatter], chars[scatter], distances)
+
+        step = HAS_MOVE[chars]
+        duration = np.where(step, STEP_DURATION, HOP_DURATION)
+        accelerate = step & (types == ACCELERATOR)
+        if accelerate.any():
+            accelerating = index[accelerate]
+            speedup = (self.speed_factor[accelerating] > AcceleratorActor.MIN_SPEED_FACTOR) & \
+                (self.random.random_sample(len(accelerating)) < AcceleratorActor.ACCELERATE_PROB)
+            self.speed_factor[accelerating[speedup]] -= AcceleratorActor.ACCELERATE_STEP
+        speedy = step & ((types == SPEEDY) | (types == ACCELERATOR))
+        duration[speedy] *= self.speed_factor[index[speedy]]
+        self._set_moves(index, t, np.where(step, STEP, HOP), DR[chars], DC[chars], duration)
+
+        jumpers = np.flatnonzero(types == JUMPER)
+        if len(jumpers):
+            self._jump_over(index[jumpers], t[jumpers], distances)
+        teleporters = np.flatnonzero((types == TELEPORTER) & ~in_goal)
+        if len(teleporters):
+            teleporting = self.random.random_sample(len(teleporters)) < TeleporterActor.TELEPORT_PROB
+            teleporters = teleporters[teleporting]
+            self._teleport(index[teleporters], t[teleporters])
+
+    def _mess_up(self, rows, cols, chars, distances):
+        # random perpendicular direction to a free cell, back if there is none
+        result = chars.copy()
+        moving = np.flatnonzero(HAS_MOVE[chars])
+        dr, dc = DR[chars[moving]], DC[chars[moving]]
+        free = []
+        for side in (1, -1):  # perpendicular (dc, dr) and (-dc, -dr)
+            r = rows[moving] + side * dc
+            c = cols[moving] + side * dr
+            ok = (0 <= r) & (r < distances.shape[0]) & (0 <= c) & (c < distances.shape[1])
+            ok[ok] = distances[r[ok], c[ok]] > 0
+            free.append(ok)
+        first, second = free
+        pick_second = second & (~first | (self.random.random_sample(len(moving)) < 0.5))
+        side = np.where(pick_second, -1, 1)
+        new_dr = np.where(first | second, side * dc, -dr)
+        new_dc = np.where(first | second, side * dr, -dc)
+        result[moving] = MOVE_CHARS[self._move_index(new_dr, new_dc)]
+        return result
+
+    @staticmethod
+    def _move_index(dr, dc):
+        # index into MOVES ('v', '>', '^', '<')
+        return np.where(dr == 1, 0, np.where(dc == 1, 1, np.where(dr == -1, 2, 3)))
+
+    def _jump_over(self, index, t, distances):
+        # JumperActor.pick_jump_target and can_jump_over, all 4 jumps at once
+        self.steps_without_jump[index] += 1
+        shape = distances.shape
+        rows = self.start_row[index, None]
+        cols = self.start_column[index, None]
+        r2, c2 = rows + JUMPS_OVER[:, 0], cols + JUMPS_OVER[:, 1]
+        inside = (0 <= r2) & (r2 < shape[0]) & (0 <= c2) & (c2 < shape[1])
+        r2, c2 = np.clip(r2, 0, shape[0] - 1), np.clip(c2, 0, shape[1] - 1)
+        r1, c1 = (rows + r2) // 2, (cols + c2) // 2  # wall between
+        here = distances[np.clip(rows, 0, shape[0] - 1), np.clip(cols, 0, shape[1] - 1)]
+        target = distances[r2, c2]
+        ok = inside & (here > target) & (target > JumperActor.MIN_DIST_GOAL) & (distances[r1, c1] < 0)
+        jump = ok.any(axis=1) & (self.steps_without_jump[index] > JumperActor.STEPS_TO_JUMP)
+        jump[jump] = self.random.random_sample(np.count_nonzero(jump)) < JumperActor.JUMP_PROB
+        if jump.any():
+            d2 = JUMPS_OVER[ok[jump].argmax(axis=1)]  # first possible, in order of D2
+            self._set_moves(index[jump], t[jump], JUMP_OVER, d2[:, 0], d2[:, 1], JumperActor.JUMP_DURATION)
+            self.steps_without_jump[index[jump]] = 0
+
+    def _teleport(self, index, t):
+        # TeleporterActor.pick_teleport_target, staying when there is no target
+        sampler = TeleportSampler.of(self.analysis, TeleporterActor.MIN_DIST_GOAL, TeleporterActor.MIN_DIST_ACTOR)
+        self.target_row[index], self.target_column[index] = sampler.sample_many(
+            self.random, self.start_row[index], self.start_column[index])
+        self._set_moves(index, t, SHIVER_OUT, 0, 0, TeleporterActor.SHIVER_DURATION)
+
+    def _interpolate(self, now):
+        p = np.clip((now - self.t0) / np.maximum(self.duration, 1e-12), 0, 1)
+        hop = p * (1 - p)
+        mode = self.mode
+        over = mode == JUMP_OVER
+        np.multiply(self.dr, p, out=self.row)
+        self.row += self.start_row
+        self.row -= hop * ((mode == HOP) | (over & (self.dc != 0)))
+        np.multiply(self.dc, p, out=self.column)
+        self.column += self.start_column
+        self.column -= hop * (over & (self.dc == 0))
+        shiver = np.flatnonzero((mode == SHIVER_OUT) | (mode == SHIVER_IN))
+        if len(shiver):
+            jitter = (self.random.random_sample((2, len(shiver))) - 0.5) * SHIVER_AMPLITUDE
+            self.row[shiver] -= p[shiver] * jitter[0]
+            self.column[shiver] -= p[shiver] * jitter[1]
+
+    async def run(self, grid, clock, frame):
+        """Coroutine advancing the batch on the clock once per frame
+        ``grid.update_actors(batch)`` is called after each advance.
+        """
+        start = clock.now()
+        while not grid.game_over:
+            self.advance(clock.now() - start)
+            grid.update_actors(self)
+            await clock.sleep(frame)
@@ -0,0 +1,241 @@
+import argparse
+import itertools
+import sys
+import numpy as np
+from . import io
+
+# Maze generators, all return int8 maze (-1 wall, 0 free, 1 goal).
+# Perfect mazes (backtracker, kruskal, wilson) have cells on even
+# coordinates and walls between them on odd ones.
+
+FILL_BAND = 1 << 20  # cells generated at once by random fill
+CAVE_STEPS = 5
+ORDERS = list(itertools.permutations(range(4)))  # of neighbours
+
+
+def random_fill(shape, density=0.3, goals=1, seed=None):
+    rng = np.random.RandomState(seed)
+    maze = np.empty(shape, dtype=np.int8)
+    flat = maze.reshape(-1)
+    threshold = int(round(density * 65536))
+    for start in range(0, flat.size, FILL_BAND):
+        band = flat[start:start+FILL_BAND]
+        walls = rng.randint(0, 65536, band.size, dtype=np.uint16) < threshold
+        np.negative(walls, out=band, dtype=np.int8)
+    place_goals(rng, flat, None, goals)
+    return maze
+
+
+def choose(rng, size, k):
+    # k distinct random numbers of range(size); RandomState.choice without
+    # replacement permutes the whole range, here just few are drawn at once
+    if 4 * k >= size:
+        return rng.permutation(size)[:k]
+    chosen = np.empty(0, dtype=np.int64)
+    while len(chosen) < k:
+        drawn = rng.randint(0, size, 2 * (k - len(chosen)), dtype=np.int64)
+        chosen = np.unique(np.concatenate([chosen, drawn]))
+    return rng.permutation(chosen)[:k]
+
+
+def place_goals(rng, flat, candidates, goals):
+    # candidates None means any cell
+    size = flat.size if candidates is None else len(candidates)
+    chosen = choose(rng, size, min(goals, size))
+    flat[chosen if candidates is None else candidates[chosen]] = 1
+
+
+def place_free_goals(rng, flat, goals):
+    # random cells are drawn and walls rejected, free cells get indexed
+    # only when most of them become goals
+    free = np.count_nonzero(flat == 0)
+    goals = min(goals, free)
+    if 4 * goals >= free:
+        place_goals(rng, flat, np.flatnonzero(flat == 0), goals)
+        return
+    chosen = np.empty(0, dtype=np.int64)
+    while len(chosen) < goals:
+        draws = min(FILL_BAND, 2 * (goals - len(chosen)) * flat.size // free + 1)
+        drawn = rng.randint(0, flat.size, draws, dtype=np.int64)
+        chosen = np.unique(np.concatenate([chosen, drawn[flat[drawn] == 0]]))
+    flat[rng.permutation(chosen)[:goals]] = 1
+
+
+def cell_grid(shape):
+    rows, cols = shape
+    return (rows + 1) // 2, (cols + 1) // 2
+
+
+def carve(shape, edges_a, edges_b, cols, goals, rng):
+    # open cells and walls between connected cell pairs (flat cell indices)
+    maze = np.full(shape, -1, dtype=np.int8)
+    maze[::2, ::2] = 0
+    edges_a = np.asarray(edges_a, dtype=np.int64)
+    edges_b = np.asarray(edges_b, dtype=np.int64)
+    maze[edges_a // cols + edges_b // cols, edges_a % cols + edges_b % cols] = 0
+    cells = maze[::2, ::2].size
+    if cells:
+        chosen = choose(rng, cells, min(goals, cells))
+        maze[2 * (chosen // cols), 2 * (chosen % cols)] = 1
+    return maze
+
+
+def neighbours(cell, rows, cols, order=range(4)):
+    row, col = divmod(cell, cols)
+    result = []
+    for i in order:
+        if i == 0 and row > 0:
+            result.append(cell - cols)
+        elif i == 1 and row < rows - 1:
+            result.append(cell + cols)
+        elif i == 2 and col > 0:
+            result.append(cell - 1)
+        elif i == 3 and col < cols - 1:
+            result.append(cell + 1)
+    return result
+
+
+def backtracker(shape, goals=1, seed=None):
+    rng = np.random.RandomState(seed)
+    rows, cols = cell_grid(shape)
+    visited = np.zeros(rows * cols, dtype=bool)
+    orders = rng.randint(0, len(ORDERS), rows * cols).tolist()
+    edges_a, edges_b = [], []
+    if rows * cols:
+        start = int(rng.randint(rows * cols))
+        visited[start] = True
+        stack = [(start, iter(neighbours(start, rows, cols, ORDERS[orders[start]])))]
+        while stack:
+            cell, candidates = stack[-1]
+            for nxt in candidates:
+                if not visited[nxt]:
+                    visited[nxt] = True
+                    edges_a.append(cell)
+                    edges_b.append(nxt)
+                    stack.append((nxt, iter(neighbours(nxt, rows, cols, ORDERS[orders[nxt]]))))
+                    break
+            else:
+                stack.pop()
+    return carve(shape, edges_a, edges_b, cols, goals, rng)
+
+
+def kruskal(shape, goals=1, seed=None):
+    rng = np.random.RandomState(seed)
+    rows, cols = cell_grid(shape)
+    cells = np.arange(rows * cols).reshape(rows, cols)
+    edges = np.concatenate([
+        np.stack([cells[:, :-1].ravel(), cells[:, 1:].ravel()], axis=1),
+        np.stack([cells[:-1, :].ravel(), cells[1:, :].ravel()], axis=1),
+    ])
+    edges = edges[rng.permutation(len(edges))]
+    parent = list(range(rows * cols))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    edges_a, edges_b = [], []
+    for a, b in edges.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            edges_a.append(a)
+            edges_b.append(b)
+    return carve(shape, edges_a, edges_b, cols, goals, rng)
+
+
+def wilson(shape, goals=1, seed=None):
+    # loop-erased random walks, uniform spanning tree
+    rng = np.random.RandomState(seed)
+    rows, cols = cell_grid(shape)
+    in_tree = np.zeros(rows * cols, dtype=bool)
+    step = {}
+    edges_a, edges_b = [], []
+    if rows * cols:
+        order = rng.permutation(rows * cols).tolist()
+        in_tree[order[0]] = True
+        choices = iter(())
+        for start in order[1:]:
+            cell = start
+            while not in_tree[cell]:
+                options = neighbours(cell, rows, cols)
+                try:
+                    pick = next(choices)
+                except StopIteration:
+                    choices = iter(rng.random_sample(4096).tolist())
+                    pick = next(choices)
+                step[cell] = options[int(pick * len(options))]  # erases loops
+                cell = step[cell]
+            cell = start
+            while not in_tree[cell]:
+                in_tree[cell] = True
+                edges_a.append(cell)
+                edges_b.append(step[cell])
+                cell = step[cell]
+    return carve(shape, edges_a, edges_b, cols, goals, rng)
+
+
+def caves(shape, density=0.45, goals=1, seed=None, steps=CAVE_STEPS):
+    # cellular automaton: wall stays/appears with 5+ walls among 8 neighbours
+    # (outside counts as wall), caves don't have to be connected
+    rng = np.random.RandomState(seed)
+    walls = rng.randint(0, 65536, shape, dtype=np.uint16) < int(round(density * 65536))
+    for _ in range(steps):
+        padded = np.pad(walls, 1, 'constant', constant_values=True)
+        count = np.zeros(shape, dtype=np.uint8)
+        rows, cols = shape
+        for dr in range(3):
+            for dc in range(3):
+                if dr != 1 or dc != 1:
+                    count += padded[dr:dr+rows, dc:dc+cols]
+        walls = count >= 5
+    maze = np.negative(walls, dtype=np.int8)
+    place_free_goals(rng, maze.reshape(-1), goals)
+    return maze
+
+
+ALGORITHMS = {
+    'random': random_fill,
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'wilson': wilson,
+    'caves': caves,
+}
+
+
+def generate(shape, algorithm='random', goals=1, seed=None, density=None):
+    if algorithm not in ALGORITHMS:
+        raise ValueError('Unknown algorithm: {}'.format(algorithm))
+    kwargs = {} if density is None else {'density': density}
+    return ALGORITHMS[algorithm](tuple(shape), goals=goals, seed=seed, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate maze.')
+    parser.add_argument('rows', type=int, nargs='?', default=1000)
+    parser.add_argument('cols', type=int, nargs='?', default=1000)
+    parser.add_argument('-a', '--algorithm', choices=sorted(ALGORITHMS), default='random')
+    parser.add_argument('-d', '--density', type=float,
+                        help='share of walls (random and caves only)')
+    parser.add_argument('-g', '--goals', type=int, default=1)
+    parser.add_argument('-s', '--seed', type=int)
+    parser.add_argument('-o', '--output', default='-',
+                        help='.maze file, CSV file or - for CSV on stdout')
+    parser.add_argument('-c', '--compression', choices=sorted(io.COMPRESSIONS), default='zlib',
+                        help='compression of .maze file')
+    args = parser.parse_args(argv)
+    if args.density is not None and args.algorithm not in ('random', 'caves'):
+        parser.error('--density is used only by random and caves algorithms')
+    maze = generate((args.rows, args.cols), args.algorithm, args.goals, args.seed, args.density)
+    if args.output == '-':
+        io.write_csv(sys.stdout.buffer, maze)
+    elif args.output.endswith(io.SUFFIX):
+        io.save(args.output, maze, compression=args.compression)
+    else:
+        io.write_csv(args.output, maze)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,21 @@
 from PyQt5 import QtWidgets, QtGui, QtCore, QtSvg, uic
 import numpy as np
-import math
+import time
 import asyncio
 import os
 import json
 import configparser
+import traceback
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from bresenham import bresenham
 from quamash import QEventLoop
-from .analysis import analyze, NoPathExistsException
-from .actors import actor_types
+from . import analyze, path_overlay, MazeAnalysis
+from . import io
+from . import metrics
+from .actors import actor_types, RealClock, ClockTask, sleep_ticks
+from .batch import ActorBatch
+from .occupancy import OccupancyIndex
 
 
 VALUE_ROLE = QtCore.Qt.UserRole
@@ -17,7 +23,9 @@ CONFIG_FILE = 'static/gui.cfg'
 LINE_MASK = 'static/pics/lines/{}.svg'
 ARROW_MASK = 'static/pics/arrows/{}.svg'
 DIRECTIONS = ['up', 'right', 'left', 'down']
-DIRECTIONS_MAP = {b'^': 0, b'>': 1, b'<': 2, b'v': 3}
+TILE_PIXELS = 256  # side of cached tile of cells, in pixels
+MIN_TILE_CELLS = 4
+MAX_TILES = 256  # least recently used tiles are dropped
 BASEDIR = os.path.dirname(__file__)
 
 
@@ -28,6 +36,20 @@ SVG_LINES = {i: QtSvg.QSvgRenderer(filepath(LINE_MASK.format(i))) for i in range
 SVG_ARROWS = {i: QtSvg.QSvgRenderer(filepath(ARROW_MASK.format(DIRECTIONS[i]))) for i in range(4)}
 
 
+def starts_array(starts):
+    return np.array(sorted(starts), dtype=np.int32).reshape(-1, 2)
+
+
+def analyze_paths(array, starts, directions=None):
+    # analysis and path overlay of starts, both release the GIL
+    with metrics.timer('make_paths_seconds'):
+        if directions is None:
+            analysis = analyze(array)
+        else:  # cached in maze file, distances are not needed for paths
+            analysis = MazeAnalysis.from_arrays(None, directions, not (directions == b' ').any())
+        return (analysis,) + path_overlay(analysis.directions, starts)
+
+
 class MazeElement:
 
     def __init__(self, values, key):
@@ -36,9 +58,37 @@ class MazeElement:
         self.value = int(key)
         self.svg = QtSvg.QSvgRenderer(self.img_path)
         self.icon = QtGui.QIcon(self.img_path)
+        self.color = QtGui.QColor(values.get('color', 'white')).rgba()
         self.actor = values.get('actor', 'basic') if self.value > 1 else None
 
 
+class SpriteCache:
+    # SVGs rasterized once per cell size into pixmaps keyed by
+    # (kind, id, cell_size), only sprites of the last size are kept
+
+    def __init__(self, renderers):
+        self.renderers = renderers  # kind -> {id: QSvgRenderer}
+        self.pixmaps = {}
+        self.size = None
+
+    def get(self, kind, key, size):
+        pixmap = self.pixmaps.get((kind, key, size))
+        if pixmap is None:
+            if size != self.size:  # zoom changed, old sprites are useless
+                self.pixmaps.clear()
+                self.size = size
+            pixmap = QtGui.QPixmap(size, size)
+            pixmap.fill(QtCore.Qt.transparent)
+            painter = QtGui.QPainter(pixmap)
+            self.renderers[kind][key].render(painter, QtCore.QRectF(0, 0, size, size))
+            painter.end()
+            self.pixmaps[(kind, key, size)] = pixmap
+        return pixmap
+
+    def draw(self, painter, rect, kind, key):
+        painter.drawPixmap(rect.topLeft(), self.get(kind, key, int(rect.width())))
+
+
 class MazeGUIStatus:
     MODE_MASK = " {} |  "
     POS_MASK = "Position: {}, {}  "
@@ -94,6 +144,56 @@ class MazeGUIStatus:
         self.score.setText(self.SCORE_MASK.format(score) if show else '')
 
 
+class FrameClock(RealClock):
+    """Real clock whose sleeps end on frames of a QTimer
+    Actor coroutines are resumed right by the timer, all actors due in
+    a frame one after another after the frame callback repainted what
+    they changed since the last frame. Actors are not woken up more often
+    than frames are drawn and no asyncio task is involved.
+    """
+
+    def __init__(self, rate, on_frame, parent):
+        self.frame = 1 / rate
+        self.frames = 0
+        self.on_frame = on_frame
+        self.sleepers = {}  # frame number -> tasks to resume
+        self.timer = QtCore.QTimer(parent)
+        self.timer.setInterval(round(1000 / rate))
+        self.timer.timeout.connect(self.tick)
+        self.timer.start()
+
+    def sleep(self, seconds):
+        return sleep_ticks(max(1, round(seconds / self.frame)))
+
+    def spawn(self, coro):
+        task = ClockTask(coro)
+        self.sleepers.setdefault(self.frames + 1, []).append(task)
+        return task
+
+    def tick(self):
+        self.frames += 1
+        self.on_frame()
+        for task in self.sleepers.pop(self.frames, ()):
+            if task.cancelled:
+                task.coro.close()
+                continue
+            try:
+                frames = task.coro.send(None)
+            except StopIteration:
+                continue
+            except Exception:  # as asyncio, failed task does not stop others
+                traceback.print_exc()
+                continue
+            self.sleepers.setdefault(self.frames + frames, []).append(task)
+
+    def stop(self):
+        self.timer.stop()
+        for tasks in self.sleepers.values():
+            for task in tasks:
+                task.coro.close()
+        self.sleepers.clear()
+
+
 class GridWidget(QtWidgets.QWidget):
 
     def __init__(self, array, gui):
@@ -102,9 +202,13 @@ class GridWidget(QtWidgets.QWidget):
         self.cell_size = int(gui.config['cell_size'])
         self.init_size = int(gui.config['cell_size'])
         self.min_cell_size = int(gui.config['min_cell_size'])
+        self.lod_cell_size = int(gui.config['lod_cell_size'])
+        self.lod = None
         self.array = array
         self.observers = []
         self.game_over = False
+        self.tiles = OrderedDict()
+        self.tiles_key = None
         self.setMouseTracking(True)
 
     def px2table(self, x, y):
@@ -116,22 +220,100 @@ class GridWidget(QtWidgets.QWidget):
     def paintEvent(self, event):
         rect = event.rect()
         painter = QtGui.QPainter(self)
-        self.paint_cells(rect, painter)
+        if not metrics.enabled:
+            self.paint(rect, painter)
+            return
+        start = time.perf_counter()
+        metrics.inc('paint_cells', self.paint(rect, painter))
+        metrics.observe('paint_frame_seconds', time.perf_counter() - start)
+
+    def paint(self, rect, painter):
+        return self.paint_cells(rect, painter)
 
     def paint_cells(self, rect, painter):
+        # cells are painted into tiles cached as pixmaps, only the tiles
+        # invalidated since the last paint are rendered again
         row_min, col_min = self.px2table(rect.left(), rect.top())
         row_min = max(row_min, 0)
         col_min = max(col_min, 0)
         row_max, col_max = self.px2table(rect.right(), rect.bottom())
         row_max = min(row_max + 1, self.array.shape[0])
         col_max = min(col_max + 1, self.array.shape[1])
-        for row in range(row_min, row_max):
-            for col in range(col_min, col_max):
+        if self.cell_size < self.lod_cell_size:
+            self.paint_lod(rect, painter)
+            return max(row_max - row_min, 0) * max(col_max - col_min, 0)
+        cells = self.tile_cells()
+        if self.tiles_key != (self.cell_size, cells):
+            self.invalidate_all()
+            self.tiles_key = (self.cell_size, cells)
+        target = QtCore.QRectF(rect)
+        for tile_row in range(row_min // cells, (row_max - 1) // cells + 1):
+            for tile_col in range(col_min // cells, (col_max - 1) // cells + 1):
+                pixmap = self.tile(tile_row, tile_col, cells)
+                x, y = self.table2px(tile_row * cells, tile_col * cells)
+                part = QtCore.QRectF(x, y, pixmap.width(), pixmap.height()).intersected(target)
+                painter.drawPixmap(part, pixmap, part.translated(-x, -y))
+        return max(row_max - row_min, 0) * max(col_max - col_min, 0)
+
+    def paint_lod(self, rect, painter):
+        # far zoomed out: image with pixel per cell, scaled without smoothing
+        size = self.cell_size
+        board = QtCore.QRectF(0, 0, *self.table2px(*self.array.shape))
+        target = QtCore.QRectF(rect).intersected(board)
+        source = QtCore.QRectF(target.x() / size, target.y() / size,
+                               target.width() / size, target.height() / size)
+        painter.drawImage(target, self.lod_image(), source)
+
+    def lod_image(self):
+        if self.lod is None:
+            pixels = np.ascontiguousarray(self.lod_colors(np.s_[:, :]))
+            rows, cols = pixels.shape
+            image = QtGui.QImage(pixels.data, cols, rows, 4 * cols, QtGui.QImage.Format_RGB32)
+            self.lod = pixels, image  # image shares memory of pixels
+        return self.lod[1]
+
+    def lod_colors(self, index):
+        return self.gui.lod_palette[self.array[index].view(np.uint8)]
+
+    def tile_cells(self):
+        return max(MIN_TILE_CELLS, TILE_PIXELS // self.cell_size)
+
+    def tile(self, tile_row, tile_col, cells):
+        key = tile_row, tile_col
+        pixmap = self.tiles.get(key)
+        if pixmap is not None:
+            self.tiles.move_to_end(key)
+            return pixmap
+        row_first, col_first = tile_row * cells, tile_col * cells
+        rows = min(cells, self.array.shape[0] - row_first)
+        cols = min(cells, self.array.shape[1] - col_first)
+        pixmap = QtGui.QPixmap(*self.table2px(rows, cols))
+        pixmap.fill(QtGui.QColor(255, 255, 255))
+        painter = QtGui.QPainter(pixmap)
+        for row in range(rows):
+            for col in range(cols):
                 x, y = self.table2px(row, col)
                 crect = QtCore.QRectF(x, y, self.cell_size, self.cell_size)
-                white = QtGui.QColor(255, 255, 255)
-                painter.fillRect(crect, QtGui.QBrush(white))
-                self.paint_cell(row, col, painter, crect)
+                self.paint_cell(row_first + row, col_first + col, painter, crect)
+        painter.end()
+        self.tiles[key] = pixmap
+        if len(self.tiles) > MAX_TILES:
+            self.tiles.popitem(last=False)
+        return pixmap
+
+    def invalidate(self, row, col):
+        self.invalidate_cells(np.array([row]), np.array([col]))
+
+    def invalidate_cells(self, rows, cols):
+        cells = self.tile_cells()
+        for key in set(zip((rows // cells).tolist(), (cols // cells).tolist())):
+            self.tiles.pop(key, None)
+        if self.lod is not None:
+            self.lod[0][rows, cols] = self.lod_colors((rows, cols))
+
+    def invalidate_all(self):
+        self.tiles.clear()
+        self.lod = None
 
     def paint_cell(self, row, col, painter, rect):
         pass
@@ -158,6 +340,7 @@ class GridWidget(QtWidgets.QWidget):
         self.update()
 
     def update_size(self):
+        self.invalidate_all()
         size = self.table2px(*self.array.shape)
         self.setMinimumSize(*size)
         self.setMaximumSize(*size)
@@ -169,9 +352,10 @@ class GridWidget(QtWidgets.QWidget):
         self.gui.status.set_zoom(100 * self.cell_size // self.init_size)
 
     def zoom_out(self):
-        if self.cell_size < self.min_cell_size:
+        cell_size = self.cell_size - max(int(self.cell_size * 0.1), 1)
+        if cell_size < self.min_cell_size:
             return
-        self.cell_size -= max(int(self.cell_size * 0.1), 1)
+        self.cell_size = cell_size
         self.update_size()
         self.gui.status.set_zoom(100 * self.cell_size // self.init_size)
 
@@ -185,12 +369,24 @@ class GridWidget(QtWidgets.QWidget):
 
 
 class GridEditWidget(GridWidget):
+    # Edits paint immediately, paths are recomputed in the background at most
+    # once per paths_interval. Results of edits made meanwhile are dropped.
+    paths_ready = QtCore.pyqtSignal(int, object)
 
     def __init__(self, array, gui):
         super().__init__(array, gui)
         self.starts = None
         self.paths = None
         self.dirs = None
+        self.analysis = None
+        self.paths_generation = 0
+        self.paths_dirty = False
+        self.paths_job = None
+        self.paths_timer = QtCore.QTimer(self)
+        self.paths_timer.setSingleShot(True)
+        self.paths_timer.setInterval(int(gui.config['paths_interval']))
+        self.paths_timer.timeout.connect(self.start_paths)
+        self.paths_ready.connect(self.finish_paths)
         self.last_mouse = None
         self.changed = False
         self.change_array(array)
@@ -209,13 +405,14 @@ class GridEditWidget(GridWidget):
         self.gui.palette.setHidden(False)
 
     def paint_cell(self, row, col, painter, rect):
-        self.gui.elements[0].svg.render(painter, rect)
+        sprites = self.gui.sprites
+        sprites.draw(painter, rect, 'element', 0)
         if self.paths[row, col] != 0:
-            SVG_LINES[self.paths[row, col]].render(painter, rect)
+            sprites.draw(painter, rect, 'line', self.paths[row, col])
             if self.array[row, col] == 0:
-                SVG_ARROWS[self.dirs[row, col]].render(painter, rect)
+                sprites.draw(painter, rect, 'arrow', self.dirs[row, col])
         if self.array[row, col] != 0:
-            self.gui.elements[self.array[row, col]].svg.render(painter, rect)
+            sprites.draw(painter, rect, 'element', self.array[row, col])
 
     def mousePressEvent(self, event):
         step = self.px2table(event.x(), event.y())
@@ -253,21 +450,23 @@ class GridEditWidget(GridWidget):
         elif (self.selected > 1) and (self.array[row, col] <= 1):  # wasn't start and now is
             self.starts.add((row, col))
         self.array[row, col] = self.selected
+        self.invalidate(row, col)
         self.set_changed(True)
         return True
 
-    def change_array(self, array):
+    def change_array(self, array, directions=None):
         self.set_changed(False)
         self.array = array
         indices = list(np.where(array > 1))
         self.starts = set(zip(list(indices[0]), list(indices[1])))
         self.update_size()
-        self.update_array()
+        self.make_paths(directions)
+        self.update()
         self.gui.status.set_size(*array.shape)
 
     def update_array(self):
-        self.make_paths()
         self.update()
+        self.schedule_paths()
 
     def set_changed(self, changed):
         self.changed = changed
@@ -275,51 +474,96 @@ class GridEditWidget(GridWidget):
         for o in self.observers:
             o.change_notice()
 
-    def make_paths(self):
-        analysis = analyze(self.array)
-        paths = np.zeros(self.array.shape, dtype=np.int8)
-        dirs = np.zeros(self.array.shape, dtype=np.int8)
-        hor_set = frozenset([2, 3, 6, 7, 10, 11, 14, 15])
-        ver_set = frozenset([4, 5, 6, 7, 12, 13, 14, 15])
-        for start in self.starts:
+    def lod_colors(self, index):
+        colors = super().lod_colors(index)
+        on_path = (self.paths[index] != 0) & (self.array[index] == 0)
+        colors[on_path] = self.gui.lod_path_color
+        return colors
+
+    def make_paths(self, directions=None):
+        # synchronous, also supersedes pending background analysis
+        self.paths_timer.stop()
+        self.paths_dirty = False
+        self.paths_generation += 1
+        self.set_paths(*analyze_paths(self.array, starts_array(self.starts), directions))
+
+    def schedule_paths(self):
+        self.paths_generation += 1
+        self.paths_dirty = True
+        if self.paths_job is None and not self.paths_timer.isActive():
+            self.paths_timer.start()
+
+    def start_paths(self):
+        if self.paths_job is not None:
+            return  # rescheduled when the running job finishes
+        self.paths_dirty = False
+        generation = self.paths_generation
+        job = self.gui.executor.submit(analyze_paths, self.array.copy(), starts_array(self.starts))
+        self.paths_job = job  # before the callback, it runs here if job is already done
+        job.add_done_callback(lambda job: self._paths_done(generation, job))
+
+    def _paths_done(self, generation, job):
+        # worker thread, the signal queues finish_paths to the GUI thread
+        try:
+            self.paths_ready.emit(generation, job)
+        except RuntimeError:  # widget deleted meanwhile
+            pass
+
+    def finish_paths(self, generation, job):
+        self.paths_job = None
+        if generation == self.paths_generation:
             try:
-                path = analysis.path(*start)
-                for step in path:
-                    x, y = step
-                    d = analysis.directions[x, y]
-                    dirs[x, y] = DIRECTIONS_MAP.get(d, 0)
-                    if d == b'<':
-                        if paths[x, y] not in hor_set:
-                            paths[x, y] += 2
-                        if paths[x, y-1] < 8:
-                            paths[x, y-1] += 8
-                    elif d == b'>':
-                        if paths[x, y] < 8:
-                            paths[x, y] += 8
-                        if paths[x, y+1] not in hor_set:
-                            paths[x, y+1] += 2
-                    elif d == b'v':
-                        if paths[x, y] not in ver_set:
-                            paths[x, y] += 4
-                        if paths[x+1, y] % 2 == 0:
-                            paths[x+1, y] += 1
-                    elif d == b'^':
-                        if paths[x, y] % 2 == 0:
-                            paths[x, y] += 1
-                        if paths[x-1, y] not in ver_set:
-                            paths[x-1, y] += 4
-            except NoPathExistsException:
-                pass
+                self.set_paths(*job.result())
+            except Exception:  # e.g. MemoryError in worker, tried once more here
+                traceback.print_exc()
+                self.retry_paths()
+            self.update()
+        elif metrics.enabled:
+            metrics.inc('make_paths_dropped')
+        if self.paths_dirty:
+            self.paths_timer.start()
+
+    def retry_paths(self):
+        try:
+            self.make_paths()
+        except Exception as e:
+            err = QtWidgets.QErrorMessage(self.gui.window)
+            err.showMessage("Couldn't find paths: {}".format(e))
+
+    def flush_paths(self):
+        if self.paths_dirty or self.paths_job is not None:
+            self.make_paths()
+
+    def set_paths(self, analysis, paths, dirs):
+        self.analysis = analysis
+        changed = None
+        if self.paths is not None and self.paths.shape == paths.shape:
+            changed = np.nonzero((self.paths != paths) | (self.dirs != dirs))
         self.paths = paths
         self.dirs = dirs
+        if changed is None:
+            self.invalidate_all()
+        else:
+            self.invalidate_cells(*changed)
 
     def save_to_file(self, filename):
+        if filename.endswith(io.SUFFIX):
+            self.flush_paths()
+            io.save(filename, self.array, directions=self.analysis.directions)
+        else:
+            np.savetxt(filename, self.array, fmt='%d')
         self.set_changed(False)
-        np.savetxt(filename, self.array, fmt='%d')
 
     def load_from_file(self, filename):
-        array = np.loadtxt(filename, dtype=np.int8)
-        self.change_array(array)
+        if io.is_maze_file(filename):
+            maze_file = io.load(filename)
+            maze = io.as_maze(maze_file.maze)
+            directions = maze_file.directions
+            if directions is not None and directions.shape != maze.shape:
+                directions = None  # not of this maze, analyzed again
+            self.change_array(maze, directions)
+        else:
+            self.change_array(np.loadtxt(filename, dtype=np.int8))
 
 
 class GridGameWidget(GridWidget):
@@ -328,6 +572,8 @@ class GridGameWidget(GridWidget):
         super().__init__(array, gui)
         self.backup_array = np.copy(array)
         self.analysis = analyze(self.array)
+        self.dirty = set()  # cells of actors to repaint in the next frame
+        self.score_changed = False
         self._setup_actors()
         gui.palette.setHidden(True)
         self.update_size()
@@ -348,20 +594,37 @@ class GridGameWidget(GridWidget):
                 raise ValueError('Unknown dude type requested: "{}".'.format(
                     self.gui.elements[kind].actor)
                 )
-            actor_type = actor_types[self.gui.elements[kind].actor]
-            self.actors.append(actor_type(self, row, col, kind))
+        self.clock = FrameClock(int(self.gui.config['frame_rate']), self.flush_frame, self)
+        if self.gui.config.get('actor_engine', 'coroutine') == 'batch':
+            rows, cols = zip(*sorted(starts))
+            kinds = self.array[rows, cols]
+            types = [self.gui.elements[kind].actor for kind in kinds]
+            batch = ActorBatch(self.analysis, rows, cols, kinds, types)
+            batch.task = self.clock.spawn(batch.run(self, self.clock, self.clock.frame))
+            self.actors = batch.actors
+        else:
+            for row, col in starts:
+                kind = self.array[row, col]
+                actor_type = actor_types[self.gui.elements[kind].actor]
+                self.actors.append(actor_type(self, row, col, kind, self.clock))
+        for row, col in starts:
             self.array[row, col] = 0
+        self.slots = {a: i for i, a in enumerate(self.actors)}
+        self.occupancy = OccupancyIndex(self.array.shape, len(self.actors))
+        self.occupancy.move_all(
+            np.array([a.row for a in self.actors], dtype=np.float64),
+            np.array([a.column for a in self.actors], dtype=np.float64)
+        )
 
-    def paintEvent(self, event):
-        rect = event.rect()
-        painter = QtGui.QPainter(self)
-        self.paint_cells(rect, painter)
+    def paint(self, rect, painter):
+        cells = self.paint_cells(rect, painter)
         self.paint_actors(painter)
+        return cells
 
     def paint_cell(self, row, col, painter, rect):
-        self.gui.elements[0].svg.render(painter, rect)
+        self.gui.sprites.draw(painter, rect, 'element', 0)
         if self.array[row, col] != 0:
-            self.gui.elements[self.array[row, col]].svg.render(painter, rect)
+            self.gui.sprites.draw(painter, rect, 'element', self.array[row, col])
 
     def paint_actors(self, painter):
         for a in self.actors:
@@ -369,7 +632,7 @@ class GridGameWidget(GridWidget):
                 *self.table2px(a.row, a.column),
                 self.cell_size, self.cell_size
             )
-            self.gui.elements[a.kind].svg.render(painter, rect)
+            self.gui.sprites.draw(painter, rect, 'element', a.kind)
 
     def mousePressEvent(self, event):
         event.accept()
@@ -377,29 +640,23 @@ class GridGameWidget(GridWidget):
         if self.inside_array(row, col):
             if self.array[row, col] == -1:
                 self.array[row, col] = 0
-                self.analysis = analyze(self.array)
+                self.analysis.remove_wall(row, col)
+                self.invalidate(row, col)
                 self.update(*self.table2px(row, col), self.cell_size, self.cell_size)
             elif self.array[row, col] == 0 and not self.actor_there(row, col):
                 self.array[row, col] = -1
-                backup_analysis = self.analysis
-                self.analysis = analyze(self.array)
+                self.analysis.add_wall(row, col)
                 if not self.actors_reachable(): # rollback
                     self.array[row, col] = 0
-                    self.analysis = backup_analysis
+                    self.analysis.remove_wall(row, col)
+                self.invalidate(row, col)
                 self.update(*self.table2px(row, col), self.cell_size, self.cell_size)
 
     def actor_there(self, row, col):
-        for a in self.actors:
-            if math.floor(a.row) <= row <= math.ceil(a.row) and \
-               math.floor(a.column) <= col <= math.ceil(a.column):
-                return True
-        return False
+        return self.occupancy.occupied(row, col)
 
     def actors_reachable(self):
-        for a in self.actors:
-            if self.analysis.directions[int(a.row), int(a.column)] == b' ':
-                return False
-        return True
+        return self.occupancy.reachable(self.analysis.directions)
 
     def mouseMoveEvent(self, event):
         point = self.px2table(event.x(), event.y())
@@ -410,14 +667,39 @@ class GridGameWidget(GridWidget):
         event.accept()
 
     def update_actor(self, actor):
-        self.update_score()
+        # repainted and scored once per frame by flush_frame
+        self.occupancy.move(self.slots[actor], actor.row, actor.column)
+        self.dirty.add((int(actor.row), int(actor.column)))
+        self.score_changed = True
         if not self.game_over and actor.in_goal:
+            self.flush_frame()
             self.game_over = True
             self.gui.game_finished(actor)
-        self.update(
-            *self.table2px(int(actor.row)-1, int(actor.column)-1),
-            3*self.cell_size, 3*self.cell_size
-        )
+
+    def update_actors(self, batch):
+        # all actors of ActorBatch moved, called once per frame
+        self.occupancy.move_all(batch.row, batch.column)
+        for rows, cols in ((batch.prev_row, batch.prev_column), (batch.row, batch.column)):
+            self.dirty.update(zip(rows.astype(int).tolist(), cols.astype(int).tolist()))
+        self.score_changed = True
+        if not self.game_over and batch.in_goal.any():
+            self.flush_frame()
+            self.game_over = True
+            self.gui.game_finished(batch.actors[np.argmax(batch.in_goal)])
+
+    def flush_frame(self):
+        if self.score_changed:
+            self.update_score()
+            self.score_changed = False
+        if self.dirty:
+            region = QtGui.QRegion()
+            for row, col in self.dirty:  # actor drawn from (row, col) overlaps 3x3 cells
+                region += QtCore.QRect(
+                    *self.table2px(row - 1, col - 1),
+                    3*self.cell_size, 3*self.cell_size
+                )
+            self.dirty.clear()
+            self.update(region)
 
     def update_score(self):
         if self.game_over:
@@ -429,14 +711,10 @@ class GridGameWidget(GridWidget):
         self.gui.status.set_score(True, best)
 
     def finalize(self):
+        self.clock.stop()
         for a in self.actors:
             a.task.cancel()
 
-    def run_until_complete(self):
-        self.gui.loop.run_until_complete(
-            asyncio.gather(*[a.task for a in self.actors])
-        )
-
 
 class MazeMainWindow(QtWidgets.QMainWindow):
 
@@ -457,6 +735,7 @@ class MazeGUI:
     def __init__(self, config):
         self.app = QtWidgets.QApplication([])
         self.config = config['gui']
+        self.executor = ThreadPoolExecutor(max_workers=1)  # background analysis
         self.filename = None
         self._setup_elements()
         self.window = MazeMainWindow(self)
@@ -478,6 +757,15 @@ class MazeGUI:
             data = json.load(f, object_pairs_hook=OrderedDict)
             data = [(int(k), MazeElement(v, k)) for k, v in data.items()]
             self.elements = OrderedDict(data)
+        self.lod_palette = np.full(256, QtGui.QColor('white').rgba(), dtype=np.uint32)
+        for value, element in self.elements.items():
+            self.lod_palette[value & 0xFF] = element.color  # indexed by int8 as uint8
+        self.lod_path_color = QtGui.QColor(self.config['lod_path_color']).rgba()
+        self.sprites = SpriteCache({
+            'element': {k: e.svg for k, e in self.elements.items()},
+            'line': SVG_LINES,
+            'arrow': SVG_ARROWS,
+        })
 
     def _setup_grid(self):
         new_array = np.zeros(
@@ -532,7 +820,7 @@ class MazeGUI:
         asyncio.set_event_loop(self.loop)
         self.loop.run_forever()
         if self.game:
-            self.grid.run_until_complete()
+            self.grid.finalize()
 
     def file_open(self):
         if self.game:
@@ -614,9 +902,13 @@ class MazeGUI:
         dialog.setDirectory(QtCore.QDir.home())
         dialog.setNameFilters([
             self.window.tr('Text Files (*.txt)'),
+            self.window.tr('Maze Files (*{})'.format(io.SUFFIX)),
             self.window.tr('All Files (*)')
         ])
         dialog.setDefaultSuffix('.txt')
+        dialog.filterSelected.connect(
+            lambda f: dialog.setDefaultSuffix(io.SUFFIX if io.SUFFIX in f else '.txt')
+        )
         if dialog.exec():
             return dialog.selectedFiles()
         return []
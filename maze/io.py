@@ -0,0 +1,247 @@
+import collections
+import io
+import struct
+import zlib
+import numpy as np
+
+# Binary maze file (.maze), all numbers little-endian:
+#   header   magic, version, compression, flags, maze dtype, rows, cols
+#   section  payload size (uint64) + payload, for maze and then
+#            optionally for cached directions (dtype S1)
+# Uncompressed payloads are raw C-ordered arrays at 8-byte aligned
+# offsets so they can be memory-mapped directly. RLE payload is number
+# of runs (uint64), run values (array dtype) and run lengths (int64).
+
+MAGIC = b'MAZE'
+VERSION = 1
+SUFFIX = '.maze'
+HEADER = struct.Struct('<4sBBBx4sQQ4x')
+SECTION = struct.Struct('<Q')
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'rle': 2}
+FLAG_DIRECTIONS = 1
+DIRECTIONS_DTYPE = np.dtype('S1')
+CSV_CHUNK = 1 << 18  # bytes parsed at once
+
+MazeFile = collections.namedtuple('MazeFile', ['maze', 'directions'])
+
+
+class MazeFormatError(ValueError):
+    pass
+
+
+def rle_encode(array):
+    flat = array.ravel()
+    if flat.size == 0:
+        return SECTION.pack(0)
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.append(starts, flat.size)).astype('<i8')
+    return b''.join([
+        SECTION.pack(starts.size),
+        flat[starts].tobytes(),
+        lengths.tobytes(),
+    ])
+
+
+def rle_decode(data, dtype, size):
+    runs, = SECTION.unpack_from(data)
+    values = np.frombuffer(data, dtype, runs, SECTION.size)
+    lengths = np.frombuffer(data, '<i8', runs, SECTION.size + values.nbytes)
+    if lengths.sum() != size:
+        raise MazeFormatError('Run lengths do not match maze shape.')
+    return np.repeat(values, lengths)
+
+
+def encode(array, compression):
+    if compression == 'zlib':
+        return zlib.compress(np.ascontiguousarray(array).data)
+    if compression == 'rle':
+        return rle_encode(array)
+    return np.ascontiguousarray(array).tobytes()
+
+
+def save(path, maze, directions=None, compression='zlib'):
+    if compression not in COMPRESSIONS:
+        raise ValueError('Unknown compression: {}'.format(compression))
+    maze = np.atleast_2d(np.asarray(maze))
+    if maze.ndim != 2:
+        raise ValueError('Maze must be 2D array.')
+    if maze.dtype.kind not in 'biufc':  # type string must fit 4 bytes of header
+        raise ValueError('Cannot store maze of type {}.'.format(maze.dtype))
+    dtype = maze.dtype.newbyteorder('<') if maze.dtype.byteorder == '>' else maze.dtype
+    maze = maze.astype(dtype, copy=False)
+    flags = 0
+    sections = [encode(maze, compression)]
+    if directions is not None:
+        directions = np.asarray(directions, dtype=DIRECTIONS_DTYPE)
+        if directions.shape != maze.shape:
+            raise ValueError('Directions must have the same shape as maze.')
+        flags |= FLAG_DIRECTIONS
+        sections.append(encode(directions, compression))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, COMPRESSIONS[compression], flags,
+                            dtype.str.encode('ascii'), *maze.shape))
+        for data in sections:
+            f.write(SECTION.pack(len(data)))
+            f.write(data)
+            f.write(b'\0' * (-len(data) % 8))  # keep next section aligned
+
+
+def read_header(f):
+    header = f.read(HEADER.size)
+    if len(header) != HEADER.size or header[:4] != MAGIC:
+        raise MazeFormatError('Not a maze file.')
+    magic, version, compression, flags, dtype, rows, cols = HEADER.unpack(header)
+    if version > VERSION:
+        raise MazeFormatError('Unsupported maze file version: {}'.format(version))
+    if compression not in COMPRESSIONS.values():
+        raise MazeFormatError('Unknown compression: {}'.format(compression))
+    return compression, flags, np.dtype(dtype.rstrip(b'\0').decode('ascii')), (rows, cols)
+
+
+def read_section(f, path, dtype, shape, compression, mmap_mode):
+    size, = SECTION.unpack(f.read(SECTION.size))
+    offset = f.tell()
+    nbytes = dtype.itemsize * shape[0] * shape[1]
+    if compression == COMPRESSIONS['none']:
+        if size != nbytes:
+            raise MazeFormatError('Section size does not match maze shape.')
+        if mmap_mode is not None and nbytes > 0:
+            array = np.memmap(path, dtype, mmap_mode, offset, shape)
+        else:
+            buffer = bytearray(nbytes)  # writable, filled without a copy
+            if f.readinto(buffer) != nbytes:
+                raise MazeFormatError('Unexpected end of file.')
+            array = np.frombuffer(buffer, dtype).reshape(shape)
+    else:
+        data = f.read(size)
+        if len(data) != size:
+            raise MazeFormatError('Unexpected end of file.')
+        if compression == COMPRESSIONS['zlib']:
+            array = np.frombuffer(bytearray(zlib.decompress(data)), dtype)
+        else:
+            array = rle_decode(data, dtype, nbytes // dtype.itemsize)
+        if array.nbytes != nbytes:
+            raise MazeFormatError('Section size does not match maze shape.')
+        array = array.reshape(shape)
+    f.seek(offset + size + (-size % 8))
+    return array
+
+
+def load(path, mmap_mode=None):
+    # mmap_mode ('r', 'r+' or 'c') maps uncompressed files instead of reading
+    with open(path, 'rb') as f:
+        compression, flags, dtype, shape = read_header(f)
+        maze = read_section(f, path, dtype, shape, compression, mmap_mode)
+        directions = None
+        if flags & FLAG_DIRECTIONS:
+            directions = read_section(f, path, DIRECTIONS_DTYPE, shape, compression, mmap_mode)
+    return MazeFile(maze, directions)
+
+
+def is_maze_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def as_maze(maze):
+    # int8 maze of both analysis backends, values out of int8 are clipped
+    # (not wrapped, 200 stays a dude and -200 a wall)
+    maze = np.atleast_2d(np.asarray(maze))  # fix matrix dims
+    if maze.dtype == np.int8:
+        return maze  # no need to copy, maze is only read
+    return np.clip(maze, -128, 127).astype('int8')
+
+
+def classify(values, out):
+    # walls -1, goals 1, everything else free 0; no int8 wrapping
+    out[...] = 0
+    out[values < 0] = -1
+    out[values == 1] = 1
+    return out
+
+
+def count_rows(path):
+    rows, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CSV_CHUNK), b''):
+            rows += chunk.count(b'\n')
+            last = chunk[-1:]
+    return rows + (last != b'\n')  # last line without newline
+
+
+def iter_csv(path, delimiter=',', raw=False, chunk_size=CSV_CHUNK):
+    # yields (first row, band) with band of whole rows parsed from one chunk;
+    # values are classified to -1/0/1 or, with raw, clipped to int8
+    row = 0
+    rest = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            data = rest + chunk
+            end = data.rfind(b'\n') + 1 if chunk else len(data)
+            data, rest = data[:end], data[end:]
+            if data.strip():
+                values = np.loadtxt(io.BytesIO(data), delimiter=delimiter,
+                                    dtype=np.int64, ndmin=2)
+                band = np.empty(values.shape, dtype=np.int8)
+                if raw:
+                    np.clip(values, -128, 127, out=values)
+                    band[...] = values
+                else:
+                    classify(values, band)
+                yield row, band
+                row += len(band)
+            if not chunk:
+                return
+
+
+def read_csv(path, delimiter=',', raw=False, out=None, chunk_size=CSV_CHUNK):
+    # out can be preallocated array or memmap of int8, rows are counted
+    # first so the maze is parsed straight into place
+    if out is None:
+        rows = count_rows(path)
+        out = None if rows else np.empty((0, 0), dtype=np.int8)
+    filled = 0
+    for row, band in iter_csv(path, delimiter, raw, chunk_size):
+        if out is None:
+            out = np.empty((rows, band.shape[1]), dtype=np.int8)
+        if band.shape[1] != out.shape[1]:
+            raise ValueError('Row {} has {} columns instead of {}.'.format(
+                row, band.shape[1], out.shape[1]))
+        if row + len(band) > len(out):
+            raise ValueError('More rows than the output array has.')
+        out[row:row+len(band)] = band
+        filled = row + len(band)
+    if out is None:  # only blank lines
+        return np.empty((0, 0), dtype=np.int8)
+    return out[:filled]
+
+
+def csv_tokens(ending):
+    # token of every int8 value followed by delimiter or newline
+    return np.array([str(v).encode('ascii') + ending for v in range(-128, 128)])
+
+
+def write_csv(path_or_file, maze, delimiter=',', band=1 << 20):
+    # tokens are looked up for band of cells at once and their bytes are
+    # gathered by mask instead of formatting every number in Python
+    maze = np.atleast_2d(np.asarray(maze))
+    if maze.dtype != np.int8:
+        if maze.size and (maze.min() < -128 or maze.max() > 127):
+            raise ValueError('Maze values must fit in int8.')
+        maze = maze.astype(np.int8)
+    separators = csv_tokens(delimiter.encode('ascii'))
+    newlines = csv_tokens(b'\n')
+    width = separators.dtype.itemsize
+    rows = max(1, band // max(maze.shape[1], 1))
+    f = open(path_or_file, 'wb') if isinstance(path_or_file, str) else path_or_file
+    try:
+        for row in range(0, maze.shape[0] if maze.size else 0, rows):
+            values = maze[row:row+rows].astype(np.int16) + 128
+            tokens = separators[values]
+            tokens[:, -1] = newlines[values[:, -1]]
+            chars = tokens.view(np.uint8).reshape(-1, width)
+            f.write(chars[chars != 0].tobytes())
+    finally:
+        if f is not path_or_file:
+            f.close()
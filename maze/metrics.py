@@ -0,0 +1,158 @@
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Opt-in instrumentation of analysis and GUI hot paths. Call sites check
+# the module-level `enabled` flag first, so disabled metrics cost a single
+# attribute lookup. Set MAZE_METRICS=1 to enable metrics at import, or
+# MAZE_METRICS=<file>.json/.prom to also dump them there at exit.
+#
+# Metric kinds:
+#   counters   monotonically increasing totals (inc)
+#   maxima     high-water marks (set_max)
+#   summaries  count, sum, min and max of observed values (observe, timer)
+
+enabled = False
+
+_lock = threading.Lock()
+_counters = {}
+_maxima = {}
+_summaries = {}
+_started = time.monotonic()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global _started
+    with _lock:
+        _counters.clear()
+        _maxima.clear()
+        _summaries.clear()
+        _started = time.monotonic()
+
+
+def inc(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_max(name, value):
+    with _lock:
+        if value > _maxima.get(name, value - 1):
+            _maxima[name] = value
+
+
+def observe(name, value):
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            _summaries[name] = {'count': 1, 'sum': value, 'min': value, 'max': value}
+        else:
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['min'] = min(summary['min'], value)
+            summary['max'] = max(summary['max'], value)
+
+
+@contextlib.contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+class _Untimed:
+    # reusable no-op context manager (contextlib.nullcontext needs 3.7)
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_untimed = _Untimed()
+
+
+def timer(name):
+    # observes duration of the block in seconds, no-op when disabled
+    return _timed(name) if enabled else _untimed
+
+
+@contextlib.contextmanager
+def collecting(clear=True):
+    # enables metrics inside the block, the previous state is restored after
+    global enabled
+    was_enabled = enabled
+    if clear:
+        reset()
+    enabled = True
+    try:
+        yield snapshot
+    finally:
+        enabled = was_enabled
+
+
+def snapshot():
+    with _lock:
+        return {
+            'elapsed_seconds': time.monotonic() - _started,
+            'counters': dict(_counters),
+            'maxima': dict(_maxima),
+            'summaries': {k: dict(v) for k, v in _summaries.items()},
+        }
+
+
+def to_json(**kwargs):
+    return json.dumps(snapshot(), **kwargs)
+
+
+def to_prometheus(prefix='maze_'):
+    data = snapshot()
+    lines = [
+        '# TYPE {}elapsed_seconds gauge'.format(prefix),
+        '{}elapsed_seconds {}'.format(prefix, data['elapsed_seconds']),
+    ]
+    for name, value in sorted(data['counters'].items()):
+        lines.append('# TYPE {}{}_total counter'.format(prefix, name))
+        lines.append('{}{}_total {}'.format(prefix, name, value))
+    for name, value in sorted(data['maxima'].items()):
+        lines.append('# TYPE {}{} gauge'.format(prefix, name))
+        lines.append('{}{} {}'.format(prefix, name, value))
+    for name, summary in sorted(data['summaries'].items()):
+        lines.append('# TYPE {}{} summary'.format(prefix, name))
+        lines.append('{}{}_count {}'.format(prefix, name, summary['count']))
+        lines.append('{}{}_sum {}'.format(prefix, name, summary['sum']))
+        lines.append('# TYPE {}{}_max gauge'.format(prefix, name))
+        lines.append('{}{}_max {}'.format(prefix, name, summary['max']))
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path):
+    with open(path, 'w') as f:
+        f.write(to_prometheus() if path.endswith('.prom') else to_json(indent=1))
+
+
+def _setup_from_env():
+    value = os.environ.get('MAZE_METRICS', '')
+    if value and value != '0':
+        enable()
+        if value.endswith(('.json', '.prom')):
+            atexit.register(dump, value)
+
+
+_setup_from_env()
@@ -0,0 +1,75 @@
+import math
+import numpy as np
+
+# Cells occupied by actors. An actor at (row, column) covers cells from
+# floor to ceil of both coordinates: its cell, or up to 2x2 cells while
+# moving between them, as GridGameWidget.actor_there always checked.
+# Actors are numbered (slots), the index keeps per cell counts of actors
+# covering it and the cell each actor is in (coordinates truncated).
+
+
+class OccupancyIndex:
+
+    def __init__(self, shape, actors):
+        self.counts = np.zeros(shape, dtype=np.int32)
+        self.footprints = np.full((actors, 4), -1, dtype=np.int64)  # floor/ceil row, floor/ceil column
+        self.rows = np.zeros(actors, dtype=np.int64)
+        self.columns = np.zeros(actors, dtype=np.int64)
+        self.placed = np.zeros(actors, dtype=bool)
+        self._last = [None] * actors  # footprints as tuples, fast checks of move
+
+    def __len__(self):
+        return len(self.rows)
+
+    def move(self, slot, row, column):
+        """Actor in ``slot`` is now at (row, column), O(1)"""
+        self.rows[slot] = int(row)
+        self.columns[slot] = int(column)
+        footprint = math.floor(row), math.ceil(row), math.floor(column), math.ceil(column)
+        old = self._last[slot]
+        if footprint == old:
+            return
+        if old is not None:
+            self._cover(*old, -1)
+        self._cover(*footprint, 1)
+        self._last[slot] = footprint
+        self.footprints[slot] = footprint
+        self.placed[slot] = True
+
+    def _cover(self, row0, row1, column0, column1, value):
+        # outside cells are not counted (hopping actor in the first row)
+        self.counts[max(row0, 0):row1 + 1, max(column0, 0):column1 + 1] += value
+
+    def move_all(self, rows, columns):
+        """All actors are now at given positions (arrays by slot)"""
+        self.rows[:] = rows  # truncated as int()
+        self.columns[:] = columns
+        footprints = np.stack([np.floor(rows), np.ceil(rows), np.floor(columns), np.ceil(columns)], axis=1)
+        footprints = footprints.astype(np.int64)
+        changed = ~self.placed | (footprints != self.footprints).any(axis=1)
+        moved = changed & self.placed
+        self._cover_all(self.footprints[moved], -1)
+        self._cover_all(footprints[changed], 1)
+        self.footprints[changed] = footprints[changed]
+        self.placed[:] = True
+        for slot, footprint in zip(np.flatnonzero(changed).tolist(), footprints[changed].tolist()):
+            self._last[slot] = tuple(footprint)
+
+    def _cover_all(self, footprints, value):
+        row0, row1, column0, column1 = footprints.T
+        rows, columns = [row0], [column0]  # each covered cell once
+        tall, wide = row1 != row0, column1 != column0
+        rows += [row1[tall], row0[wide], row1[tall & wide]]
+        columns += [column0[tall], column1[wide], column1[tall & wide]]
+        rows, columns = np.concatenate(rows), np.concatenate(columns)
+        inside = (rows >= 0) & (rows < self.counts.shape[0]) & \
+            (columns >= 0) & (columns < self.counts.shape[1])
+        np.add.at(self.counts, (rows[inside], columns[inside]), value)
+
+    def occupied(self, row, column):
+        """Whether any actor covers the cell, O(1)"""
+        return self.counts[row, column] > 0
+
+    def reachable(self, directions):
+        """Whether a goal can be reached from cells of all actors"""
+        return not (directions[self.rows, self.columns] == b' ').any()
@@ -0,0 +1,223 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+from collections import namedtuple
+import numpy as np
+from . import analyze, io
+from .actors import actor_types, sleep_ticks, ClockTask
+from .batch import ActorBatch
+
+# Headless game: actors of the GUI game mode run on a virtual clock with
+# seeded random numbers, nothing is drawn and nobody sleeps. The same maze,
+# seed and settings always give the same result.
+
+PALETTE = os.path.join(os.path.dirname(__file__), 'static/palette.json')
+RESOLUTION = 1000  # clock ticks per second
+CELL_SIZE = 16  # pixels per cell, actors move by about one pixel per sleep
+MAX_TIME = 3600.0  # seconds of virtual time
+BATCH_FRAME = 0.1  # least seconds between advances of the batch engine
+ENGINES = ('coroutine', 'batch')
+
+ActorResult = namedtuple('ActorResult', 'row column kind actor arrival score')
+SimulationResult = namedtuple('SimulationResult', 'time score actors')
+
+
+def palette_actors(path=PALETTE):
+    # maze values of dudes -> actor type names, as configured for the GUI
+    with open(path) as f:
+        palette = json.load(f)
+    return {int(k): v['actor'] for k, v in palette.items() if 'actor' in v}
+
+
+class VirtualClock:
+    """Discrete clock with its own scheduler of actor coroutines
+    Time advances in ticks of ``1 / resolution`` seconds straight to the
+    next wakeup, ties are resumed in the order they were scheduled.
+    """
+
+    def __init__(self, seed=None, resolution=RESOLUTION):
+        self.random = random.Random(seed)
+        self.resolution = resolution
+        self.ticks = 0
+        self._queue = []
+        self._order = itertools.count()
+
+    def now(self):
+        return self.ticks / self.resolution
+
+    def sleep(self, seconds):
+        return sleep_ticks(max(1, round(seconds * self.resolution)))
+
+    def spawn(self, coro):
+        task = ClockTask(coro)
+        heapq.heappush(self._queue, (self.ticks, next(self._order), task))
+        return task
+
+    def run(self, until, max_time=MAX_TIME):
+        # resumes tasks until until() is true or there is nothing to do
+        max_ticks = round(max_time * self.resolution)
+        queue = self._queue
+        while queue and not until():
+            ticks, _, task = heapq.heappop(queue)
+            if ticks > max_ticks:
+                self.ticks = max_ticks
+                break
+            if task.cancelled:
+                task.coro.close()
+                continue
+            self.ticks = ticks
+            try:
+                delay = task.coro.send(None)
+            except StopIteration:
+                continue
+            heapq.heappush(queue, (ticks + delay, next(self._order), task))
+
+    def close(self):
+        for _, _, task in self._queue:
+            task.coro.close()
+        self._queue.clear()
+
+
+class SimulationGrid:
+    """Grid of the game mode as seen by actors, records their arrivals
+    Dudes in a goal would jump there forever, their tasks end instead.
+    """
+
+    def __init__(self, analysis, cell_size, clock):
+        self.analysis = analysis
+        self.cell_size = cell_size
+        self.clock = clock
+        self.game_over = False
+        self.arrivals = {}
+
+    def inside_array(self, row, col):
+        shape = self.analysis.directions.shape
+        return 0 <= row < shape[0] and 0 <= col < shape[1]
+
+    def update_actor(self, actor):
+        if actor.in_goal and actor not in self.arrivals:
+            self.arrivals[actor] = self.clock.now(), actor.score
+            actor.task.cancel()
+
+
+def simulate(maze, seed=None, until='first', analysis=None, actors=None, engine='coroutine',
+             cell_size=CELL_SIZE, resolution=RESOLUTION, frame=BATCH_FRAME, max_time=MAX_TIME):
+    """Play a game of the maze without GUI
+
+    :param until: 'first' ends the game when the first dude reaches a goal
+                  (as in the GUI), 'all' when all dudes do
+    :param analysis: analysis of the maze, reused when simulating it repeatedly
+    :param actors: maze values of dudes -> actor type names, palette by default
+    :param engine: 'coroutine' runs actor classes on VirtualClock (with
+                   cell_size and resolution), 'batch' advances ActorBatch
+                   to the next decision, at least frame seconds ahead
+    :return: SimulationResult with virtual time, best score and ActorResult
+             of each dude by its start (arrival is None if it has not
+             reached a goal)
+    """
+    if until not in ('first', 'all'):
+        raise ValueError('Unknown end of game: "{}".'.format(until))
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine: "{}".'.format(engine))
+    if analysis is None:
+        analysis = analyze(maze)
+    if actors is None:
+        actors = palette_actors()
+    starts = np.argwhere(maze > 1)
+    if len(starts) == 0:
+        raise ValueError('No dudes in the maze.')
+    kinds = maze[maze > 1].astype(int).tolist()
+    for (row, col), kind in zip(starts.tolist(), kinds):
+        if analysis.directions[row, col] == b' ':
+            raise ValueError('Some dude(s) cannot reach goal.')
+        if actors.get(kind) not in actor_types:
+            raise ValueError('Unknown dude type requested: "{}".'.format(actors.get(kind)))
+    needed = 1 if until == 'first' else len(starts)
+    if engine == 'batch':
+        time, arrivals, scores = _simulate_batch(
+            analysis, starts, kinds, actors, seed, needed, frame, max_time)
+    else:
+        time, arrivals, scores = _simulate_coroutines(
+            analysis, starts, kinds, actors, seed, needed, cell_size, resolution, max_time)
+    results = [
+        ActorResult(row, col, kind, actors[kind], arrival, score)
+        for (row, col), kind, arrival, score in zip(starts.tolist(), kinds, arrivals, scores)
+    ]
+    return SimulationResult(time, max(scores), results)
+
+
+def _simulate_coroutines(analysis, starts, kinds, actors, seed, needed, cell_size, resolution, max_time):
+    clock = VirtualClock(seed, resolution)
+    grid = SimulationGrid(analysis, cell_size, clock)
+    dudes = [
+        actor_types[actors[kind]](grid, row, col, kind, clock)
+        for (row, col), kind in zip(starts.tolist(), kinds)
+    ]
+    arrivals = grid.arrivals
+    try:
+        clock.run(lambda: len(arrivals) >= needed, max_time)
+    finally:
+        grid.game_over = True
+        clock.close()
+    results = [arrivals.get(dude, (None, dude.score)) for dude in dudes]
+    return clock.now(), [r[0] for r in results], [r[1] for r in results]
+
+
+def _simulate_batch(analysis, starts, kinds, actors, seed, needed, frame, max_time):
+    batch = ActorBatch(analysis, starts[:, 0], starts[:, 1], kinds,
+                       [actors[kind] for kind in kinds], seed)
+    now = 0.0
+    while True:
+        batch.advance(now, positions=False)
+        batch.stop(np.flatnonzero(batch.in_goal))  # would hop in the goal forever
+        arrived = np.sort(batch.arrival[~np.isnan(batch.arrival)])
+        if len(arrived) >= needed:
+            time = float(arrived[needed - 1])  # arrivals are exact, frames are not
+            break
+        if now >= max_time:
+            time = max_time
+            break
+        now = min(max(now + frame, batch.next_decision()), max_time)
+    arrivals = [None if np.isnan(a) else float(a) for a in batch.arrival]
+    scores = np.minimum(batch.score, time).tolist()
+    return time, arrivals, scores
+
+
+def simulate_many(maze, seeds, **kwargs):
+    # games of one maze with different seeds, the maze is analyzed once
+    kwargs.setdefault('analysis', analyze(maze))
+    for seed in seeds:
+        yield simulate(maze, seed, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate games of a maze without GUI.')
+    parser.add_argument('maze', help='.maze or CSV file')
+    parser.add_argument('-n', '--games', type=int, default=1)
+    parser.add_argument('-s', '--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('-u', '--until', choices=['first', 'all'], default='first')
+    parser.add_argument('-e', '--engine', choices=ENGINES, default='coroutine')
+    parser.add_argument('--cell-size', type=int, default=CELL_SIZE,
+                        help='pixels per cell, actors wake up about once per pixel')
+    args = parser.parse_args(argv)
+    if io.is_maze_file(args.maze):
+        maze = io.load(args.maze).maze
+    else:
+        maze = io.read_csv(args.maze, raw=True)
+    seeds = range(args.seed, args.seed + args.games)
+    games = simulate_many(maze, seeds, until=args.until, engine=args.engine,
+                          cell_size=args.cell_size)
+    for seed, game in zip(seeds, games):
+        print(json.dumps({
+            'seed': seed,
+            'time': game.time,
+            'score': game.score,
+            'actors': [r._asdict() for r in game.actors],
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import math
+import weakref
+import numpy as np
+
+# Teleport targets of TeleporterActor: cells farther than min_goal from
+# a goal, except those within min_actor (euclidean) of the teleporting
+# actor. Candidates of the analysis are kept as sorted flat indices, cells
+# of one row are contiguous, so the excluded disc is a range of candidates
+# per row of the disc, found by binary search. A target is drawn uniformly
+# from the rest: a few random candidates are tried first, then one random
+# number indexes the candidates outside the disc, so it never fails when
+# there is a target. Samplers are shared per analysis and rebuilt when its
+# walls change.
+
+
+def _isqrt(n):
+    # math.isqrt needs Python 3.8
+    root = int(math.sqrt(n))
+    while root * root > n:
+        root -= 1
+    while (root + 1) * (root + 1) <= n:
+        root += 1
+    return root
+
+
+class TeleportSampler:
+    TRIES = 4  # random candidates tried before the exact sample
+    _cache = weakref.WeakKeyDictionary()  # analysis -> {(min_goal, min_actor): sampler}
+
+    def __init__(self, distances, min_goal, min_actor):
+        self.shape = distances.shape
+        self.min_actor = min_actor
+        self.version = None
+        self.candidates = np.flatnonzero(distances > min_goal)
+        self.disc_rows = np.arange(-min_actor, min_actor + 1)
+        self.disc_halves = np.array([_isqrt(min_actor ** 2 - dr ** 2) for dr in self.disc_rows])
+        self.disc = list(zip(self.disc_rows.tolist(), self.disc_halves.tolist()))
+
+    def __len__(self):
+        return len(self.candidates)
+
+    @classmethod
+    def of(cls, analysis, min_goal, min_actor):
+        """Sampler of current distances of the analysis, built once per wall change"""
+        samplers = cls._cache.setdefault(analysis, {})
+        sampler = samplers.get((min_goal, min_actor))
+        if sampler is None or sampler.version != analysis.version:
+            sampler = cls(analysis.distances, min_goal, min_actor)
+            sampler.version = analysis.version
+            samplers[min_goal, min_actor] = sampler
+        return sampler
+
+    def _bounds(self, rows, columns):
+        # flat index bounds [first, last + 1) of the discs around cells by
+        # rows of the disc (ascending), rows outside the maze are empty
+        height, width = self.shape
+        disc_rows = np.clip(np.asarray(rows)[..., None] + self.disc_rows, -1, height)
+        first = np.maximum(np.asarray(columns)[..., None] - self.disc_halves, 0)
+        last = np.minimum(np.asarray(columns)[..., None] + self.disc_halves, width - 1)
+        return np.stack([disc_rows * width + first, disc_rows * width + last + 1], axis=-2)
+
+    def sample(self, random, row, column):
+        """Target for an actor in cell (row, column), drawn by ``random.randrange``
+        The actor stays in its cell if there is no target.
+        """
+        # accepted tries are uniform among allowed targets too
+        candidates, width = self.candidates, self.shape[1]
+        for _ in range(self.TRIES if len(candidates) else 0):
+            target_row, target_column = divmod(int(candidates[random.randrange(len(candidates))]), width)
+            if (target_row - row) ** 2 + (target_column - column) ** 2 > self.min_actor ** 2:
+                return target_row, target_column
+        return self.sample_exact(random, row, column)
+
+    def sample_exact(self, random, row, column):
+        # one random number, candidates in the disc are counted and skipped
+        height, width = self.shape
+        bounds = []  # as _bounds, faster for one cell
+        for dr, half in self.disc:
+            disc_row = min(max(row + dr, -1), height)
+            bounds += disc_row * width + max(column - half, 0), disc_row * width + min(column + half, width - 1) + 1
+        bounds = np.searchsorted(self.candidates, bounds).tolist()
+        starts, stops = bounds[::2], bounds[1::2]
+        allowed = len(self.candidates) - sum(stops) + sum(starts)
+        if allowed <= 0:
+            return row, column
+        pick = random.randrange(allowed)
+        for start, stop in zip(starts, stops):  # k-th allowed -> k-th candidate
+            if pick >= start:
+                pick += stop - start
+        return divmod(int(self.candidates[pick]), self.shape[1])
+
+    def sample_many(self, generator, rows, columns):
+        """Targets for actors in cells (arrays), drawn by ``numpy.random.RandomState``"""
+        target_rows = np.array(rows, dtype=np.int64)
+        target_columns = np.array(columns, dtype=np.int64)
+        bounds = np.searchsorted(self.candidates, self._bounds(target_rows, target_columns))
+        starts, lengths = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+        allowed = len(self.candidates) - lengths.sum(axis=1)
+        found = allowed > 0
+        if found.any():
+            allowed = allowed[found]
+            picks = (generator.random_sample(len(allowed)) * allowed).astype(np.int64)
+            np.minimum(picks, allowed - 1, out=picks)  # product may round up
+            for start, length in zip(starts[found].T, lengths[found].T):
+                picks += np.where(picks >= start, length, 0)
+            target_rows[found], target_columns[found] = np.divmod(self.candidates[picks], self.shape[1])
+        return target_rows, target_columns
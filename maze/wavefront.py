@@ -0,0 +1,231 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .io import as_maze
+
+# Pure NumPy analysis used when the Cython extension is not compiled.
+# Whole BFS level is expanded at once with shifted boolean masks; ties
+# between equally short paths are broken like in the Cython engines.
+# Engine choice is accepted and ignored, weighted and compact analyses
+# and analyze_file need the extension.
+
+ENGINES = ('auto', 'queue', 'hybrid')
+
+WAVE_SHIFTS = [  # direction, cells slice, their parents slice
+    (b'^', np.s_[1:, :], np.s_[:-1, :]),
+    (b'v', np.s_[:-1, :], np.s_[1:, :]),
+    (b'<', np.s_[:, 1:], np.s_[:, :-1]),
+    (b'>', np.s_[:, :-1], np.s_[:, 1:]),
+]
+STEPS = {b'v': (1, 0), b'^': (-1, 0), b'>': (0, 1), b'<': (0, -1)}
+OVERLAY = {  # direction: line bit, line bit of next cell, arrow code
+    b'^': (1, 4, 0),
+    b'<': (2, 8, 2),
+    b'v': (4, 1, 3),
+    b'>': (8, 2, 1),
+}
+
+
+class NoPathExistsException(Exception):
+    pass
+
+
+def flood(maze):
+    start = time.perf_counter() if metrics.enabled else 0
+    frontier = maze == 1
+    unvisited = (maze >= 0) & ~frontier
+    distances = np.full(maze.shape, -1, dtype='int32')
+    directions = np.full(maze.shape, b' ', dtype='S1')
+    directions[maze < 0] = b'#'
+    directions[frontier] = b'X'
+    distances[frontier] = 0
+
+    level = 0
+    while frontier.any():
+        if metrics.enabled:
+            size = np.count_nonzero(frontier)
+            metrics.inc('flood_cells_visited', size)
+            metrics.set_max('flood_queue_high_water', size)
+        level += 1
+        found = np.zeros(maze.shape, dtype=bool)
+        for direction, cells, parents in WAVE_SHIFTS:
+            new = frontier[parents] & unvisited[cells]
+            np.copyto(directions[cells], direction, where=new)
+            np.copyto(distances[cells], level, where=new)
+            unvisited[cells] ^= new
+            found[cells] |= new
+        frontier = found
+    if metrics.enabled:
+        metrics.observe('flood_seconds', time.perf_counter() - start)
+    return distances, directions, not unvisited.any()
+
+
+def build_path(directions, row, column):
+    if directions[row, column] == b'#' or directions[row, column] == b' ':
+        raise NoPathExistsException
+    path = [(row, column)]
+    while directions[row, column] != b'X':
+        dr, dc = STEPS[directions[row, column]]
+        row += dr
+        column += dc
+        path.append((row, column))
+    return path
+
+
+def trace_paths(directions, starts):
+    starts = np.asarray(starts, dtype='int32').reshape(-1, 2)
+    offsets = np.zeros(len(starts) + 1, dtype='int64')
+    traced = []
+    for i, (row, column) in enumerate(starts.tolist()):
+        if not (0 <= row < directions.shape[0] and 0 <= column < directions.shape[1]):
+            raise IndexError('Cell ({}, {}) is outside of the maze.'.format(row, column))
+        try:
+            traced.extend(build_path(directions, row, column))
+        except NoPathExistsException:
+            pass  # no path, empty segment
+        offsets[i+1] = len(traced)
+    return offsets, np.array(traced, dtype='int32').reshape(-1, 2)
+
+
+def label_goals(directions):
+    # Goals are numbered in row-major order, every cell points to the next
+    # cell of its path and pointers are doubled until they reach goals
+    flat = directions.ravel()
+    columns = directions.shape[1]
+    goals = np.flatnonzero(flat == b'X')
+    roots = np.full(flat.size, -1, dtype='int64')
+    roots[goals] = goals
+    for direction, (dr, dc) in STEPS.items():
+        cells = np.flatnonzero(flat == direction)
+        roots[cells] = cells + dr * columns + dc
+    while True:
+        jumped = np.where(roots >= 0, roots[roots], -1)
+        if np.array_equal(jumped, roots):
+            break
+        roots = jumped
+    labels = np.full(flat.size, -1, dtype='int32')
+    on_path = roots >= 0
+    labels[on_path] = np.searchsorted(goals, roots[on_path])
+    return labels.reshape(directions.shape)
+
+
+def goal_distances(directions, k):
+    goals = np.argwhere(directions == b'X')
+    if not 0 <= k <= len(goals):
+        raise ValueError('Maze has {} goals, cannot use {}.'.format(len(goals), k))
+    maze = np.where(directions == b'#', -1, 0).astype('int8')
+    out = np.full((k,) + directions.shape, -1, dtype='int32')
+    for i, (row, column) in enumerate(goals[:k].tolist()):
+        maze[row, column] = 1  # one goal at a time, others are free cells
+        out[i] = flood(maze)[0]
+        maze[row, column] = 0
+    return out
+
+
+def path_overlay(directions, starts):
+    _, coords = trace_paths(directions, starts)
+    on_path = np.zeros(directions.shape, dtype=bool)
+    on_path[coords[:, 0], coords[:, 1]] = True
+    paths = np.zeros(directions.shape, dtype='int8')
+    arrows = np.zeros(directions.shape, dtype='int8')
+    for direction, (line, entry, arrow) in OVERLAY.items():
+        rows, columns = np.nonzero(on_path & (directions == direction))
+        dr, dc = STEPS[direction]
+        paths[rows, columns] |= line
+        paths[rows + dr, columns + dc] |= entry  # no duplicates for one direction
+        arrows[rows, columns] = arrow
+    return paths, arrows
+
+
+class MazeAnalysis:
+    version = 0  # incremented when walls change, for caches of derived data
+    _goal_id = None
+
+    def __init__(self, maze, engine='auto', weighted=False, costs=None, out=None):
+        if engine not in ENGINES:
+            raise ValueError('Unknown analysis engine: "{}".'.format(engine))
+        if weighted:
+            raise ValueError('Weighted analysis needs the compiled extension.')
+        maze = as_maze(maze)
+        self.distances, self.directions, self.is_reachable = flood(maze)
+        if out is not None:  # e.g. memory-mapped files, filled in place
+            distances, directions = out
+            if distances.shape != maze.shape or directions.shape != maze.shape or \
+               directions.dtype != 'S1':
+                raise ValueError('Output arrays must be int32 and S1 of the maze shape.')
+            distances[...] = self.distances
+            directions[...] = self.directions
+            self.distances, self.directions = distances, directions
+
+    @classmethod
+    def from_arrays(cls, distances, directions, is_reachable):
+        analysis = cls.__new__(cls)
+        analysis.distances = distances
+        analysis.directions = directions
+        analysis.is_reachable = is_reachable
+        return analysis
+
+    @property
+    def goal_id(self):
+        if self._goal_id is None:
+            self._goal_id = label_goals(self.directions)
+        return self._goal_id
+
+    def distances_per_goal(self, k=None):
+        if k is None:
+            k = np.count_nonzero(self.directions == b'X')
+        return goal_distances(self.directions, k)
+
+    def path(self, row, column, as_array=False):
+        path = build_path(self.directions, row, column)
+        if metrics.enabled:
+            metrics.observe('path_length', len(path))
+        if as_array:
+            return np.array(path, dtype='int32')
+        return path
+
+    def paths(self, starts):
+        return trace_paths(self.directions, starts)
+
+    def path_union(self, starts):
+        _, coords = self.paths(starts)
+        counts = np.zeros(self.directions.shape, dtype='int32')
+        np.add.at(counts, (coords[:, 0], coords[:, 1]), 1)
+        return counts
+
+    def add_wall(self, row, column):
+        self.version += 1
+        if self.directions[row, column] == b'#':
+            return False
+        return self._reflood(row, column, -1)
+
+    def remove_wall(self, row, column):
+        self.version += 1
+        if self.directions[row, column] != b'#':
+            return False
+        return self._reflood(row, column, 0)
+
+    def _reflood(self, row, column, value):
+        # no incremental repair here, whole maze is flooded again
+        maze = np.where(self.directions == b'#', -1, 0).astype('int8')
+        maze[self.directions == b'X'] = 1
+        maze[row, column] = value
+        distances, directions, is_reachable = flood(maze)
+        self._goal_id = None
+        self.distances[...] = distances
+        self.directions[...] = directions
+        was_reachable = self.is_reachable
+        self.is_reachable = is_reachable
+        return was_reachable != is_reachable
+
+
+def analyze(maze, engine='auto', weighted=False, costs=None, compact=False, out=None):
+    if compact:
+        raise ValueError('Compact analysis needs the compiled extension.')
+    return MazeAnalysis(maze, engine, weighted, costs, out)
+
+
+def analyze_many(mazes, workers=None):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyze, mazes))
@@ -34,9 +34,10 @@ setup(
         language="c++"
     ),
     include_dirs=[numpy.get_include()],
+    python_requires='>=3.5',
     install_requires=[
-        'Cython>=0.25.1',
-        'numpy>=1.11.2',
+        'Cython>=0.29.31',
+        'numpy>=1.13',
         'py>=1.4.31',
         'PyQt5>=5.7',
         'bresenham>=0.1',
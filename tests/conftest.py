@@ -1,9 +1,9 @@
 import pytest
-import numpy as np
 import sys
 import os
 myPath = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, myPath + '/../')
+from maze.io import read_csv
 
 
 mazes_root = "tests/fixtures/mazes/"
@@ -15,7 +15,7 @@ def load_mazes(folder):
         path = os.path.join(folder, name)
         if os.path.isfile(path) and name.endswith('.csv'):
             maze_num = int(name[:-4])
-            result[maze_num] = np.loadtxt(path, delimiter=',', dtype='int8')
+            result[maze_num] = read_csv(path, raw=True)
     return result
 
 
@@ -1,6 +1,8 @@
+import heapq
 import pytest
 import numpy as np
-from maze import analyze, NoPathExistsException
+from maze import analyze, analyze_many, path_overlay, NoPathExistsException
+from maze.analysis import analyze_file
 
 
 def inside(coords, matrix):
@@ -99,3 +101,377 @@ def test_paths_exception(mazes, mtype, number, row, column):
     analysis = analyze(maze)
     with pytest.raises(NoPathExistsException):
         analysis.path(row, column)
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 2), ('simple', 3), ('simple', 4),
+    ('bounds', 1), ('bounds', 2), ('bounds', 3), ('bounds', 4),
+    ('multigoal', 1), ('multigoal', 2), ('multigoal', 3), ('multigoal', 4),
+    ('unreachable', 1), ('unreachable', 2)
+])
+def test_incremental_walls(mazes, mtype, number):
+    maze = np.atleast_2d(np.copy(mazes[mtype][number]))
+    analysis = analyze(maze)
+    rng = np.random.RandomState(number)
+    for _ in range(50 if maze.size > 0 else 0):
+        row, column = rng.randint(maze.shape[0]), rng.randint(maze.shape[1])
+        was_reachable = analysis.is_reachable
+        if maze[row, column] < 0:
+            maze[row, column] = 0
+            changed = analysis.remove_wall(row, column)
+        else:
+            maze[row, column] = -1
+            changed = analysis.add_wall(row, column)
+        assert changed == (was_reachable != analysis.is_reachable)
+        verify_matrices(maze, analysis)
+        fresh = analyze(maze)
+        assert np.array_equal(analysis.distances, fresh.distances)
+        assert np.array_equal(analysis.directions, fresh.directions)
+
+
+def test_analyze_many(mazes):
+    batch = [maze for group in mazes.values() for maze in group.values()]
+    results = analyze_many(batch, workers=4)
+    assert len(results) == len(batch)
+    for maze, analysis in zip(batch, results):
+        verify_matrices(maze, analysis)
+        assert np.array_equal(analysis.distances, analyze(maze).distances)
+
+
+@pytest.mark.parametrize('engine', ['auto', 'queue', 'hybrid'])
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 2), ('simple', 3), ('simple', 4),
+    ('bounds', 1), ('bounds', 2), ('bounds', 3), ('bounds', 4),
+    ('multigoal', 1), ('multigoal', 2), ('multigoal', 3), ('multigoal', 4),
+    ('unreachable', 1), ('unreachable', 2)
+])
+def test_engines(mazes, mtype, number, engine):
+    maze = mazes[mtype][number]
+    analysis = analyze(maze, engine=engine)
+    verify_matrices(maze, analysis)
+    reference = analyze(maze, engine='queue')
+    assert np.array_equal(analysis.distances, reference.distances)
+    assert np.array_equal(analysis.directions, reference.directions)
+
+
+@pytest.mark.parametrize('wall_share,goal_share', [(0.1, 0.2), (0.3, 0.001), (0.45, 0.01)])
+def test_engines_random(wall_share, goal_share):
+    rng = np.random.RandomState(42)
+    maze = np.where(rng.rand(300, 400) < wall_share, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < goal_share] = 1
+    queue = analyze(maze, engine='queue')
+    hybrid = analyze(maze, engine='hybrid')
+    assert np.array_equal(queue.distances, hybrid.distances)
+    assert np.array_equal(queue.directions, hybrid.directions)
+    assert queue.is_reachable == hybrid.is_reachable
+
+
+def test_unknown_engine(mazes):
+    with pytest.raises(ValueError):
+        analyze(mazes['simple'][1], engine='dfs')
+
+
+@pytest.mark.parametrize('mtype,number,row,column', [
+    ('simple', 1, 1, 0), ('simple', 1, 1, 4), ('simple', 1, 3, 1),
+    ('multigoal', 4, 0, 0), ('multigoal', 4, 3, 0)
+])
+def test_path_array(mazes, mtype, number, row, column):
+    analysis = analyze(mazes[mtype][number])
+    path = analysis.path(row, column, as_array=True)
+    assert path.dtype == np.int32
+    assert path.shape == (analysis.distances[row, column] + 1, 2)
+    assert [tuple(step) for step in path.tolist()] == analysis.path(row, column)
+
+
+def test_paths_batch(mazes):
+    maze = mazes['multigoal'][4]
+    analysis = analyze(maze)
+    starts = list(np.ndindex(maze.shape))
+    offsets, coords = analysis.paths(starts)
+    assert offsets.shape == (len(starts) + 1,)
+    assert coords.shape == (offsets[-1], 2)
+    for i, start in enumerate(starts):
+        segment = [tuple(step) for step in coords[offsets[i]:offsets[i+1]].tolist()]
+        try:
+            assert segment == analysis.path(*start)
+        except NoPathExistsException:
+            assert segment == []
+
+
+def test_paths_outside(mazes):
+    analysis = analyze(mazes['simple'][1])
+    with pytest.raises(IndexError):
+        analysis.paths([(0, 0), (100, 0)])
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('multigoal', 3), ('multigoal', 4), ('unreachable', 1)
+])
+def test_path_union(mazes, mtype, number):
+    maze = np.atleast_2d(mazes[mtype][number])
+    analysis = analyze(maze)
+    starts = list(np.ndindex(maze.shape)) * 2  # also duplicate starts
+    _, coords = analysis.paths(starts)
+    expected = np.zeros(maze.shape, dtype='int32')
+    np.add.at(expected, (coords[:, 0], coords[:, 1]), 1)
+    assert np.array_equal(analysis.path_union(starts), expected)
+    assert not analysis.path_union([]).any()
+
+
+def dijkstra(maze, costs):
+    distances = np.full(maze.shape, -1, dtype='int64')
+    heap = [(0, x, y) for x, y in zip(*np.where(maze == 1))]
+    while heap:
+        d, x, y = heapq.heappop(heap)
+        if distances[x, y] != -1:
+            continue
+        distances[x, y] = d
+        for ox, oy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nx, ny = x + ox, y + oy
+            if inside((nx, ny), maze) and maze[nx, ny] >= 0 and distances[nx, ny] == -1:
+                heapq.heappush(heap, (d + costs[nx, ny], nx, ny))
+    return distances
+
+
+def verify_weighted(maze, costs, analysis):
+    assert np.array_equal(analysis.distances, dijkstra(maze, costs))
+    steps = {b'v': (1, 0), b'^': (-1, 0), b'>': (0, 1), b'<': (0, -1)}
+    for x, y in np.ndindex(maze.shape):
+        if analysis.directions[x, y] in steps:
+            ox, oy = steps[analysis.directions[x, y]]
+            assert analysis.distances[x, y] == costs[x, y] + analysis.distances[x+ox, y+oy], \
+                "Direction leading wrong way"
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_weighted(seed):
+    rng = np.random.RandomState(seed)
+    maze = rng.randint(-20, 60, size=(25, 30))
+    maze[rng.rand(*maze.shape) < 0.01] = 1
+    analysis = analyze(maze, weighted=True)
+    verify_weighted(maze, np.maximum(maze, 1), analysis)
+    costs = rng.randint(1, 10**6, size=maze.shape)  # radix heap instead of buckets
+    verify_weighted(maze, costs, analyze(maze, weighted=True, costs=costs))
+    costs = rng.randint(1, 5, size=maze.shape)
+    analysis = analyze(maze, weighted=True, costs=costs)
+    verify_weighted(maze, costs, analysis)
+    for _ in range(10):
+        row, column = rng.randint(maze.shape[0]), rng.randint(maze.shape[1])
+        if maze[row, column] < 0:
+            maze[row, column] = 0
+            analysis.remove_wall(row, column)
+        else:
+            maze[row, column] = -1
+            analysis.add_wall(row, column)
+        verify_weighted(maze, costs, analysis)
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 2), ('bounds', 1), ('bounds', 2),
+    ('multigoal', 3), ('unreachable', 1), ('unreachable', 2)
+])
+def test_weighted_unit_costs(mazes, mtype, number):
+    maze = mazes[mtype][number]
+    analysis = analyze(maze, weighted=True, costs=np.ones(np.atleast_2d(maze).shape))
+    verify_matrices(maze, analysis)
+    assert np.array_equal(analysis.distances, analyze(maze).distances)
+
+
+def test_weighted_widening():
+    maze = np.array([[1, 0, 0, 0]])
+    analysis = analyze(maze, weighted=True, costs=[[1, 2**30, 2**30, 2**30]])
+    assert analysis.distances.dtype == np.int64
+    assert analysis.distances.tolist() == [[0, 2**30, 2**31, 3 * 2**30]]
+
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_weighted_distances_per_goal(seed):
+    rng = np.random.RandomState(seed)
+    maze = rng.randint(-10, 30, size=(15, 20))
+    maze[rng.rand(*maze.shape) < 0.03] = 1
+    goals = list(zip(*np.where(maze == 1)))
+    per_goal = analyze(maze, weighted=True).distances_per_goal()
+    assert per_goal.shape == (len(goals),) + maze.shape
+    costs = np.maximum(maze, 1)
+    for j, goal in enumerate(goals):
+        single = np.where(maze == 1, 0, maze)
+        single[goal] = 1
+        assert np.array_equal(per_goal[j], analyze(single, weighted=True, costs=costs).distances)
+    wide = analyze(np.array([[1, 0, 1]]), weighted=True, costs=[[1, 2**30, 2**30]])
+    assert wide.distances_per_goal().tolist() == [[[0, 2**30, 2**31]], [[2**30 + 1, 2**30, 0]]]
+
+
+def test_weighted_invalid_costs():
+    with pytest.raises(ValueError):
+        analyze(np.array([[1, 0]]), weighted=True, costs=[[1, 0]])
+    with pytest.raises(ValueError):
+        analyze(np.array([[1, 0]]), weighted=True, costs=[[1, 1, 1]])
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('bounds', 2), ('multigoal', 1), ('multigoal', 2),
+    ('multigoal', 3), ('multigoal', 4), ('unreachable', 2)
+])
+def test_goal_id(mazes, mtype, number):
+    maze = np.atleast_2d(mazes[mtype][number])
+    analysis = analyze(maze)
+    goals = list(zip(*np.where(maze == 1)))
+    for x, y in np.ndindex(maze.shape):
+        if analysis.distances[x, y] == -1:
+            assert analysis.goal_id[x, y] == -1, "Goal of cell without path"
+        else:
+            assert goals[analysis.goal_id[x, y]] == analysis.path(x, y)[-1], "Wrong goal"
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_distances_per_goal(seed):
+    rng = np.random.RandomState(seed)
+    maze = np.where(rng.rand(20, 15) < 0.3, -1, 0)
+    maze[rng.rand(*maze.shape) < 0.25] = 1  # more than 64 goals
+    goals = list(zip(*np.where(maze == 1)))
+    analysis = analyze(maze)
+    per_goal = analysis.distances_per_goal()
+    assert per_goal.shape == (len(goals),) + maze.shape
+    for j, goal in enumerate(goals):
+        single = np.where(maze == 1, 0, maze)
+        single[goal] = 1
+        assert np.array_equal(per_goal[j], analyze(single).distances)
+    assert np.array_equal(analysis.distances_per_goal(3), per_goal[:3])
+    with pytest.raises(ValueError):
+        analysis.distances_per_goal(len(goals) + 1)
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 2), ('simple', 3), ('simple', 4),
+    ('bounds', 1), ('bounds', 2), ('bounds', 3), ('bounds', 4),
+    ('multigoal', 1), ('multigoal', 2), ('multigoal', 3), ('multigoal', 4),
+    ('unreachable', 1), ('unreachable', 2)
+])
+def test_compact(mazes, mtype, number):
+    maze = mazes[mtype][number]
+    compact = analyze(maze, compact=True)
+    verify_matrices(maze, compact)
+    reference = analyze(maze)
+    assert np.array_equal(compact.directions, reference.directions)
+    assert np.array_equal(compact.distances, reference.distances)
+    assert compact.distances.dtype.itemsize <= reference.distances.dtype.itemsize
+    assert compact.is_reachable == reference.is_reachable
+
+
+def test_compact_random():
+    rng = np.random.RandomState(3)
+    maze = np.where(rng.rand(301, 203) < 0.35, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.001] = 1
+    compact = analyze(maze, compact=True)
+    reference = analyze(maze)
+    assert compact.nbytes * 2 < maze.size
+    assert compact.distances.dtype == np.int32
+    assert np.array_equal(compact.distances, reference.distances)
+    assert np.array_equal(compact.directions, reference.directions)
+    for row, column in zip(*np.where(reference.distances > 0)):
+        assert compact.path(row, column) == reference.path(row, column)
+    with pytest.raises(NoPathExistsException):
+        compact.path(*np.argwhere(maze < 0)[0])
+
+
+@pytest.mark.parametrize('tile', [3, 4, 100])
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 3), ('multigoal', 1), ('multigoal', 4),
+    ('unreachable', 1), ('unreachable', 2)
+])
+def test_analyze_file(mazes, tmpdir, mtype, number, tile):
+    maze = np.atleast_2d(mazes[mtype][number])
+    path = str(tmpdir.join('maze.int8'))
+    maze.tofile(path)
+    analysis = analyze_file(path, maze.shape, str(tmpdir.join('out')), tile=tile)
+    assert isinstance(analysis.distances, np.memmap)
+    verify_matrices(maze, analysis)
+    assert np.array_equal(analysis.distances, analyze(maze).distances)
+
+
+
+@pytest.mark.parametrize('engine', ['queue', 'hybrid'])
+def test_analyze_out(mazes, tmpdir, engine):
+    maze = np.atleast_2d(mazes['multigoal'][4])
+    path = str(tmpdir.join('maze.int8'))
+    maze.tofile(path)
+    maze_map = np.memmap(path, dtype='int8', mode='r', shape=maze.shape)
+    distances = np.memmap(str(tmpdir.join('distances')), 'int32', 'w+', shape=maze.shape)
+    directions = np.memmap(str(tmpdir.join('directions')), 'S1', 'w+', shape=maze.shape)
+    analysis = analyze(maze_map, engine=engine, out=(distances, directions))
+    assert analysis.distances is distances and analysis.directions is directions
+    reference = analyze(maze)
+    assert np.array_equal(distances, reference.distances)
+    assert np.array_equal(directions, reference.directions)
+    row, column = np.argwhere(maze > 1)[0]
+    analysis.add_wall(row, column)
+    assert distances[row, column] == -1 and directions[row, column] == b'#'
+    for kwargs in ({'weighted': True}, {'compact': True}):
+        with pytest.raises(ValueError):
+            analyze(maze, out=(distances, directions), **kwargs)
+    with pytest.raises(ValueError):
+        analyze(maze, out=(distances[1:], directions[1:]))
+
+
+def test_analyze_file_random(tmpdir):
+    rng = np.random.RandomState(11)
+    maze = np.where(rng.rand(90, 70) < 0.35, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.002] = 1
+    path = str(tmpdir.join('maze.int8'))
+    maze.tofile(path)
+    analysis = analyze_file(path, maze.shape, str(tmpdir), tile=16)
+    reference = analyze(maze)
+    assert np.array_equal(analysis.distances, reference.distances)
+    assert analysis.is_reachable == reference.is_reachable
+
+
+
+@pytest.mark.parametrize('resident', [1, 2, 16])
+def test_analyze_file_serpentine(tmpdir, resident):
+    # path crosses tile borders back and forth, tiles are revisited
+    maze = np.zeros((41, 37), dtype='int8')
+    maze[1::2, :] = -1
+    maze[1::4, -1] = 0
+    maze[3::4, 0] = 0
+    maze[0, 0] = 1
+    path = str(tmpdir.join('maze.int8'))
+    maze.tofile(path)
+    analysis = analyze_file(path, maze.shape, str(tmpdir), tile=8, resident=resident)
+    verify_matrices(maze, analysis)
+    assert np.array_equal(analysis.distances, analyze(maze).distances)
+
+
+def reference_overlay(directions, starts):
+    # cell by cell construction the GUI used before path_overlay
+    bits = {b'^': (1, 4, 0, (-1, 0)), b'<': (2, 8, 2, (0, -1)),
+            b'v': (4, 1, 3, (1, 0)), b'>': (8, 2, 1, (0, 1))}
+    paths = np.zeros(directions.shape, dtype='int8')
+    arrows = np.zeros(directions.shape, dtype='int8')
+    for row, column in starts:
+        if directions[row, column] in (b'#', b' '):
+            continue
+        while directions[row, column] != b'X':
+            line, entry, arrow, (dr, dc) = bits[directions[row, column]]
+            paths[row, column] |= line
+            arrows[row, column] = arrow
+            row, column = row + dr, column + dc
+            paths[row, column] |= entry
+    return paths, arrows
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_path_overlay(seed):
+    rng = np.random.RandomState(seed)
+    maze = np.where(rng.rand(40, 30) < 0.3, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.005] = 1
+    analysis = analyze(maze)
+    starts = rng.randint(0, 30, size=(25, 2)).astype('int32')
+    paths, arrows = path_overlay(analysis.directions, starts)
+    expected_paths, expected_arrows = reference_overlay(analysis.directions, starts)
+    assert np.array_equal(paths, expected_paths)
+    assert np.array_equal(arrows, expected_arrows)
+    paths, arrows = path_overlay(analysis.directions, np.zeros((0, 2), dtype='int32'))
+    assert not paths.any() and not arrows.any()
+    with pytest.raises(IndexError):
+        path_overlay(analysis.directions, np.array([[40, 0]], dtype='int32'))
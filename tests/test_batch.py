@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+from maze import analyze, generate
+from maze.batch import ActorBatch, TYPES
+
+
+def batch_of(maze, types, seed=0):
+    starts = np.argwhere(maze > 1)
+    return ActorBatch(analyze(maze), starts[:, 0], starts[:, 1],
+                      maze[maze > 1], types, seed)
+
+
+def test_step_interpolation():
+    maze = np.array([[2, 0, 0, 0, 0, 1]], dtype=np.int8)
+    batch = batch_of(maze, ['speedy'])
+    for now, column in [(0, 0), (0.1, 0.4), (0.25, 1), (0.6, 2.4), (1.25, 5), (3, 5)]:
+        batch.advance(now)
+        assert batch.row[0] == pytest.approx(0) or now >= 1.25  # hops in the goal
+        assert batch.column[0] == pytest.approx(column)
+    assert batch.in_goal[0]
+    assert batch.arrival[0] == 1.25
+    assert batch.score[0] == 1.25
+    assert batch.actors[0].score == 1.25
+
+
+@pytest.mark.parametrize('actor', TYPES)
+@pytest.mark.parametrize('seed', [0, 1])
+def test_moves_stay_free(actor, seed):
+    maze = generate.generate((21, 21), 'caves', seed=seed)
+    free = np.argwhere(analyze(maze).distances > 0)
+    starts = free[np.random.RandomState(seed).choice(len(free), 20)]
+    batch = ActorBatch(analyze(maze), starts[:, 0], starts[:, 1], [2] * 20, [actor] * 20, seed)
+    for now in np.arange(0, 20, 0.1):
+        batch.advance(now)
+        # cells the moves start in are always free and reachable
+        assert (maze[batch.start_row, batch.start_column] >= 0).all()
+        assert (batch.analysis.distances[batch.start_row, batch.start_column] >= 0).all()
+        assert (np.abs(batch.row - batch.start_row) <= 2).all()
+        assert (np.abs(batch.column - batch.start_column) <= 2).all()
+    assert (batch.score <= now).all()
+    assert np.isnan(batch.arrival).all() or np.nanmax(batch.arrival) <= now
+
+
+def test_walls_change():
+    maze = np.array([[1, 0, 0, 2], [0, 0, 0, 0]], dtype=np.int8)
+    batch = batch_of(maze, ['speedy'])
+    batch.advance(0)
+    assert (batch.dr[0], batch.dc[0]) == (0, -1)
+    batch.analysis.add_wall(0, 1)
+    batch.advance(0.25)  # next decision reads the new directions
+    assert (batch.start_row[0], batch.start_column[0]) == (0, 2)
+    assert (batch.dr[0], batch.dc[0]) == (1, 0)
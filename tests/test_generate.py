@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+from maze import analyze
+from maze import generate, io
+
+ALGORITHMS = sorted(generate.ALGORITHMS)
+PERFECT = ['backtracker', 'kruskal', 'wilson']
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+@pytest.mark.parametrize('shape', [(1, 1), (1, 8), (2, 2), (21, 31), (20, 30)])
+def test_generate(algorithm, shape):
+    maze = generate.generate(shape, algorithm, goals=3, seed=7)
+    assert maze.shape == shape
+    assert maze.dtype == np.int8
+    assert set(np.unique(maze)) <= {-1, 0, 1}
+    assert np.count_nonzero(maze == 1) == min(3, np.count_nonzero(maze >= 0))
+    assert np.array_equal(maze, generate.generate(shape, algorithm, goals=3, seed=7))
+
+
+@pytest.mark.parametrize('algorithm', PERFECT)
+@pytest.mark.parametrize('shape', [(1, 9), (21, 31), (20, 30)])
+def test_perfect(algorithm, shape):
+    maze = generate.generate(shape, algorithm, seed=3)
+    assert analyze(maze).is_reachable
+    rows, cols = generate.cell_grid(shape)
+    assert np.count_nonzero(maze >= 0) == 2 * rows * cols - 1  # spanning tree
+    if min(shape) > 1:
+        assert not np.array_equal(maze, generate.generate(shape, algorithm, seed=4))
+
+
+@pytest.mark.parametrize('density', [0.0, 0.3, 1.0])
+def test_random_density(density):
+    maze = generate.random_fill((200, 150), density=density, goals=0, seed=1)
+    assert abs(np.count_nonzero(maze == -1) / maze.size - density) < 0.01
+
+
+
+@pytest.mark.parametrize('size, k', [(0, 0), (10, 10), (10, 3), (10 ** 12, 50)])
+def test_choose(size, k):
+    chosen = generate.choose(np.random.RandomState(2), size, k)
+    assert len(chosen) == len(set(chosen.tolist())) == k
+    assert all(0 <= c < size for c in chosen.tolist())
+
+
+
+@pytest.mark.parametrize('goals', [0, 1, 5, 40, 100])
+def test_place_free_goals(goals):
+    flat = np.where(np.random.RandomState(1).rand(1000) < 0.9, -1, 0).astype(np.int8)
+    free = np.flatnonzero(flat == 0)
+    generate.place_free_goals(np.random.RandomState(goals), flat, goals)
+    assert np.count_nonzero(flat == 1) == min(goals, len(free))
+    assert set(np.flatnonzero(flat == 1).tolist()) <= set(free.tolist())
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        generate.generate((5, 5), 'prim')
+
+
+@pytest.mark.parametrize('suffix', ['.maze', '.csv'])
+def test_cli(tmpdir, suffix):
+    path = str(tmpdir.join('out' + suffix))
+    generate.main(['15', '11', '-a', 'kruskal', '-g', '2', '-s', '5', '-o', path])
+    expected = generate.generate((15, 11), 'kruskal', goals=2, seed=5)
+    if suffix == '.maze':
+        assert np.array_equal(io.load(path).maze, expected)
+    else:
+        assert np.array_equal(io.read_csv(path), expected)
+
+
+def test_cli_stdout(capsysbinary):
+    generate.main(['2', '3', '-d', '0', '-s', '1'])
+    maze = generate.generate((2, 3), density=0, seed=1)
+    out = capsysbinary.readouterr().out
+    assert out == ''.join(','.join(map(str, row)) + '\n' for row in maze.tolist()).encode()
+
+
+def test_cli_default_size(tmpdir):
+    path = str(tmpdir.join('out.maze'))
+    generate.main(['-s', '2', '-o', path])  # like old generate.py, 1000x1000
+    assert np.array_equal(io.load(path).maze, generate.generate((1000, 1000), seed=2))
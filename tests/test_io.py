@@ -0,0 +1,159 @@
+import pytest
+import numpy as np
+from maze import analyze
+from maze import io
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib', 'rle'])
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 3), ('multigoal', 2), ('unreachable', 1),
+    ('bounds', 1), ('bounds', 2)
+])
+def test_roundtrip(mazes, tmpdir, compression, mtype, number):
+    maze = np.atleast_2d(mazes[mtype][number])
+    path = str(tmpdir.join('test.maze'))
+    io.save(path, maze, compression=compression)
+    loaded = io.load(path)
+    assert loaded.directions is None
+    assert loaded.maze.dtype == np.int8
+    assert np.array_equal(loaded.maze, maze)
+    assert loaded.maze.flags.writeable
+
+
+@pytest.mark.parametrize('compression', ['none', 'zlib', 'rle'])
+def test_directions(mazes, tmpdir, compression):
+    maze = mazes['multigoal'][3]
+    analysis = analyze(maze)
+    path = str(tmpdir.join('test.maze'))
+    io.save(path, maze, directions=analysis.directions, compression=compression)
+    loaded = io.load(path)
+    assert np.array_equal(loaded.maze, maze)
+    assert np.array_equal(loaded.directions, analysis.directions)
+
+
+@pytest.mark.parametrize('dtype', ['int8', 'int16', '>i4', 'uint64', 'bool', '>f8', 'complex128'])
+def test_dtypes(tmpdir, dtype):
+    maze = np.arange(-6, 6).reshape(3, 4).astype(dtype)
+    path = str(tmpdir.join('test.maze'))
+    io.save(path, maze, compression='rle')
+    loaded = io.load(path)
+    assert loaded.maze.dtype == maze.dtype.newbyteorder('<')
+    assert np.array_equal(loaded.maze, maze)
+
+
+def test_memmap(tmpdir):
+    maze = np.random.RandomState(5).randint(-1, 2, size=(37, 21)).astype('int8')
+    directions = analyze(maze).directions
+    path = str(tmpdir.join('test.maze'))
+    io.save(path, maze, directions=directions, compression='none')
+    loaded = io.load(path, mmap_mode='r')
+    assert isinstance(loaded.maze, np.memmap)
+    assert isinstance(loaded.directions, np.memmap)
+    assert np.array_equal(loaded.maze, maze)
+    assert np.array_equal(loaded.directions, directions)
+
+
+def test_rle_smaller(tmpdir):
+    maze = np.zeros((200, 300), dtype='int8')
+    maze[50:150, 100] = -1
+    io.save(str(tmpdir.join('rle.maze')), maze, compression='rle')
+    io.save(str(tmpdir.join('raw.maze')), maze, compression='none')
+    assert tmpdir.join('rle.maze').size() < tmpdir.join('raw.maze').size() / 20
+
+
+def test_not_maze_file(tmpdir):
+    path = tmpdir.join('test.txt')
+    path.write('0 1\n-1 0\n')
+    assert not io.is_maze_file(str(path))
+    with pytest.raises(io.MazeFormatError):
+        io.load(str(path))
+
+
+def test_truncated(tmpdir):
+    path = tmpdir.join('test.maze')
+    io.save(str(path), np.zeros((10, 10), dtype='int8'), compression='none')
+    path.write_binary(path.read_binary()[:-20])
+    with pytest.raises(io.MazeFormatError):
+        io.load(str(path))
+
+
+def test_invalid_arguments(tmpdir):
+    path = str(tmpdir.join('test.maze'))
+    with pytest.raises(ValueError):
+        io.save(path, np.zeros((2, 2)), compression='lzma')
+    with pytest.raises(ValueError):
+        io.save(path, np.zeros((2, 2)), directions=np.zeros((3, 2), dtype='S1'))
+    for dtype in ['<M8[ns]', 'U3', 'O']:
+        with pytest.raises(ValueError):
+            io.save(path, np.zeros((2, 2), dtype=dtype))
+
+
+def write_csv(tmpdir, values, newline=True):
+    path = tmpdir.join('maze.csv')
+    text = '\n'.join(','.join(str(v) for v in row) for row in values)
+    path.write(text + ('\n' if newline else ''))
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 1 << 22])
+@pytest.mark.parametrize('newline', [True, False])
+def test_read_csv(tmpdir, chunk_size, newline):
+    values = np.random.RandomState(3).randint(-1000, 2000, size=(23, 17))
+    values[values % 5 == 0] = 1
+    path = write_csv(tmpdir, values, newline)
+    maze = io.read_csv(path, chunk_size=chunk_size)
+    assert maze.dtype == np.int8
+    assert np.array_equal(maze, np.where(values < 0, -1, np.where(values == 1, 1, 0)))
+    raw = io.read_csv(path, raw=True, chunk_size=chunk_size)
+    assert np.array_equal(raw, np.clip(values, -128, 127))
+    assert np.array_equal(analyze(raw).distances, analyze(values).distances)
+
+
+def test_read_csv_no_overflow(tmpdir):
+    path = write_csv(tmpdir, [[255, 1, 257, -129]])
+    assert io.read_csv(path).tolist() == [[0, 1, 0, -1]]
+    assert io.read_csv(path, raw=True).tolist() == [[127, 1, 127, -128]]
+
+
+def test_read_csv_bands(tmpdir):
+    values = np.arange(200).reshape(40, 5)
+    path = write_csv(tmpdir, values)
+    bands = list(io.iter_csv(path, raw=True, chunk_size=50))
+    assert len(bands) > 1
+    assert [row for row, _ in bands] == np.cumsum([0] + [len(b) for _, b in bands[:-1]]).tolist()
+    assert np.array_equal(np.concatenate([b for _, b in bands]), np.clip(values, -128, 127))
+
+
+def test_read_csv_out(tmpdir):
+    values = np.random.RandomState(4).randint(-2, 3, size=(30, 12))
+    path = write_csv(tmpdir, values)
+    out = np.memmap(str(tmpdir.join('maze.int8')), np.int8, 'w+', shape=values.shape)
+    maze = io.read_csv(path, raw=True, out=out, chunk_size=40)
+    assert np.array_equal(out, values)
+    assert np.shares_memory(maze, out)
+
+
+def test_read_csv_invalid(tmpdir):
+    path = tmpdir.join('maze.csv')
+    path.write('0,1\n0,1,0\n')
+    with pytest.raises(ValueError):
+        io.read_csv(str(path))
+    path.write('0,1\n0,0\n')
+    with pytest.raises(ValueError):
+        io.read_csv(str(path), out=np.empty((1, 2), dtype=np.int8))
+    path.write('')
+    assert io.read_csv(str(path)).shape == (0, 0)
+
+
+def test_write_csv(tmpdir):
+    maze = np.arange(-128, 128).reshape(16, 16).astype(np.int8)
+    path = str(tmpdir.join('maze.csv'))
+    io.write_csv(path, maze, band=40)
+    assert np.array_equal(np.loadtxt(path, delimiter=',', dtype=np.int64), maze)
+    io.write_csv(path, np.zeros((3, 0)))
+    assert tmpdir.join('maze.csv').read() == ''
+    io.write_csv(path, [[-128, 0], [1, 127]])
+    assert tmpdir.join('maze.csv').read() == '-128,0\n1,127\n'
+    for values in ([[0, 128]], [[-129, 0]]):
+        with pytest.raises(ValueError):
+            io.write_csv(path, values)
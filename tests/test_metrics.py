@@ -0,0 +1,68 @@
+import json
+import pytest
+import numpy as np
+from maze import analyze, metrics, wavefront
+
+
+def random_maze(seed):
+    rng = np.random.RandomState(seed)
+    maze = np.where(rng.rand(60, 50) < 0.3, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.01] = 1
+    return maze
+
+
+def test_disabled():
+    metrics.reset()
+    assert not metrics.enabled
+    analyze(random_maze(0))
+    with metrics.timer('block_seconds'):
+        pass
+    data = metrics.snapshot()
+    assert data['counters'] == data['maxima'] == data['summaries'] == {}
+
+
+@pytest.mark.parametrize('func', [
+    lambda m: analyze(m, engine='queue'),
+    lambda m: analyze(m, engine='hybrid'),
+    wavefront.analyze,
+])
+def test_flood(func):
+    maze = random_maze(1)
+    with metrics.collecting() as snapshot:
+        analysis = func(maze)
+        analysis.distances[analysis.distances < 0] = 0
+        row, col = np.unravel_index(np.argmax(analysis.distances), maze.shape)
+        analysis.path(row, col)
+        analysis.path(row, col, as_array=True)
+    assert not metrics.enabled
+    data = snapshot()
+    visited = np.count_nonzero(analysis.directions != b'#') - np.count_nonzero(analysis.directions == b' ')
+    assert data['counters']['flood_cells_visited'] == visited
+    assert 0 < data['maxima']['flood_queue_high_water'] <= visited
+    assert data['summaries']['flood_seconds']['count'] == 1
+    path_length = data['summaries']['path_length']
+    assert path_length['count'] == 2
+    assert path_length['max'] == analysis.distances[row, col] + 1
+
+
+def test_summaries():
+    with metrics.collecting():
+        for value in [3, 1, 2]:
+            metrics.observe('value', value)
+        metrics.inc('ticks')
+        metrics.inc('ticks', 4)
+        metrics.set_max('high', 5)
+        metrics.set_max('high', 2)
+        with metrics.timer('block_seconds'):
+            pass
+    data = json.loads(metrics.to_json())
+    assert data['summaries']['value'] == {'count': 3, 'sum': 6, 'min': 1, 'max': 3}
+    assert data['counters'] == {'ticks': 5}
+    assert data['maxima'] == {'high': 5}
+    assert data['summaries']['block_seconds']['count'] == 1
+    text = metrics.to_prometheus()
+    assert '# TYPE maze_ticks_total counter\nmaze_ticks_total 5\n' in text
+    assert 'maze_value_count 3\nmaze_value_sum 6\n' in text
+    assert 'maze_high 5\n' in text
+    metrics.reset()
+    assert metrics.snapshot()['counters'] == {}
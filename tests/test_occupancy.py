@@ -0,0 +1,59 @@
+import math
+import pytest
+import numpy as np
+from maze.occupancy import OccupancyIndex
+
+
+def covered(positions, row, col):
+    # GridGameWidget.actor_there scanning all actors
+    for r, c in positions:
+        if math.floor(r) <= row <= math.ceil(r) and math.floor(c) <= col <= math.ceil(c):
+            return True
+    return False
+
+
+def random_positions(rng, shape, n):
+    # cells, moves between cells, hops above the first row, shivers
+    rows = rng.randint(0, shape[0], n) + rng.choice([0, 0, 0.5, -0.25, 0.1], n)
+    cols = rng.randint(0, shape[1], n) + rng.choice([0, 0, 0.5, -0.1, 0.7], n)
+    return np.clip(rows, -0.25, shape[0] - 1), np.clip(cols, -0.1, shape[1] - 1)
+
+
+@pytest.mark.parametrize('vectorized', [False, True])
+@pytest.mark.parametrize('seed', range(5))
+def test_occupied(vectorized, seed):
+    rng = np.random.RandomState(seed)
+    shape, n = (12, 9), 15
+    index = OccupancyIndex(shape, n)
+    for _ in range(20):
+        rows, cols = random_positions(rng, shape, n)
+        if vectorized:
+            index.move_all(rows, cols)
+        else:
+            for slot in rng.permutation(n):
+                index.move(slot, rows[slot], cols[slot])
+        positions = list(zip(rows, cols))
+        for row in range(shape[0]):
+            for col in range(shape[1]):
+                assert index.occupied(row, col) == covered(positions, row, col)
+        assert index.counts.min() >= 0
+        assert index.rows.tolist() == [int(r) for r in rows]
+        assert index.columns.tolist() == [int(c) for c in cols]
+
+
+def test_mixed_moves():
+    index = OccupancyIndex((5, 5), 2)
+    index.move_all(np.array([0.0, 4.0]), np.array([0.0, 4.0]))
+    index.move(0, 0.5, 0)
+    assert index.occupied(1, 0)
+    index.move_all(np.array([2.0, 4.0]), np.array([2.0, 4.0]))
+    assert np.argwhere(index.counts).tolist() == [[2, 2], [4, 4]]
+
+
+def test_reachable():
+    directions = np.array([[b'X', b'<', b' '], [b'^', b'#', b' ']], dtype='S1')
+    index = OccupancyIndex(directions.shape, 2)
+    index.move_all(np.array([0.0, 1.0]), np.array([1.0, 0.4]))
+    assert index.reachable(directions)
+    index.move(1, 0.0, 2.0)
+    assert not index.reachable(directions)
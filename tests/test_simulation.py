@@ -0,0 +1,101 @@
+import json
+import pytest
+import numpy as np
+from maze import analyze, generate, simulation
+
+
+def game_maze(dudes=10, seed=1):
+    maze = generate.generate((41, 41), 'backtracker', seed=seed)
+    free = np.argwhere(maze == 0)
+    rng = np.random.RandomState(seed)
+    for i, (row, col) in enumerate(free[rng.choice(len(free), dudes, replace=False)]):
+        maze[row, col] = 2 + i % 5  # all dude types of the palette
+    return maze
+
+
+def test_palette_actors():
+    assert simulation.palette_actors() == {
+        2: 'speedy', 3: 'accelerator', 4: 'jumper', 5: 'teleporter', 6: 'scatterbrain',
+    }
+
+
+@pytest.mark.parametrize('engine', simulation.ENGINES)
+def test_corridor_engines(engine):
+    maze = np.array([[2, 0, 0, 0, 0, 1], [4, -1, 0, 0, 0, 0]], dtype=np.int8)
+    result = simulation.simulate(maze, until='all', engine=engine, cell_size=64)
+    speedy, jumper = result.actors
+    # coroutines overshoot every move by a sleep (1/64 of a cell here)
+    overshoot = 1.0 if engine == 'batch' else 1 + 1 / 64
+    assert speedy.arrival == pytest.approx(5 * 0.25 * overshoot, rel=0.01)
+    assert jumper.arrival == pytest.approx((1 + 5) * overshoot, rel=0.01)  # up, 5 steps
+
+
+@pytest.mark.parametrize('cell_size', [1, 16, 64])
+def test_corridor(cell_size):
+    maze = np.array([[2, 0, 0, 0, 0, 1]], dtype=np.int8)
+    result = simulation.simulate(maze, cell_size=cell_size)
+    # speedy step lasts 0.25 s, up to the sleep that overshoots it
+    sleep = round(250 / cell_size)
+    step = (250 // sleep + 1) * sleep / 1000
+    time = pytest.approx(5 * step)
+    assert result.actors == [simulation.ActorResult(0, 0, 2, 'speedy', time, time)]
+    assert result.time == result.actors[0].arrival
+
+
+@pytest.mark.parametrize('engine', simulation.ENGINES)
+@pytest.mark.parametrize('until', ['first', 'all'])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_deterministic(engine, until, seed):
+    maze = game_maze(seed=seed)
+    result = simulation.simulate(maze, seed, until=until, engine=engine)
+    assert result == simulation.simulate(maze, seed, until=until, engine=engine)
+    arrivals = [r.arrival for r in result.actors if r.arrival is not None]
+    assert len(arrivals) == (1 if until == 'first' else len(result.actors))
+    assert result.time == max(arrivals)
+    assert result.score == max(r.score for r in result.actors)
+    assert [[r.row, r.column] for r in result.actors] == np.argwhere(maze > 1).tolist()
+
+
+def test_simulate_many():
+    maze = game_maze()
+    games = list(simulation.simulate_many(maze, range(5), until='all'))
+    assert games == [simulation.simulate(maze, seed, until='all') for seed in range(5)]
+    assert len(set(game.time for game in games)) > 1  # random actors differ with seed
+
+
+@pytest.mark.parametrize('engine', simulation.ENGINES)
+def test_max_time(engine):
+    maze = np.array([[6, 0, 0, 0, 0, 0, 0, 0, 0, 1]], dtype=np.int8)
+    result = simulation.simulate(maze, 0, max_time=1.0, engine=engine)
+    assert result.time == 1.0
+    assert result.actors[0].arrival is None
+
+
+@pytest.mark.parametrize('maze, kwargs', [
+    (np.array([[0, 0, 1]], dtype=np.int8), {}),
+    (np.array([[2, -1, 1]], dtype=np.int8), {}),
+    (np.array([[7, 0, 1]], dtype=np.int8), {}),
+    (np.array([[2, 0, 1]], dtype=np.int8), {'until': 'never'}),
+    (np.array([[2, 0, 1]], dtype=np.int8), {'engine': 'threads'}),
+])
+def test_errors(maze, kwargs):
+    with pytest.raises(ValueError):
+        simulation.simulate(maze, **kwargs)
+
+
+def test_analysis_reused():
+    maze = game_maze()
+    analysis = analyze(maze)
+    assert simulation.simulate(maze, 3, analysis=analysis) == simulation.simulate(maze, 3)
+
+
+@pytest.mark.parametrize('engine', simulation.ENGINES)
+def test_main_csv(capsys, engine):
+    path = 'tests/fixtures/game.csv'
+    simulation.main([path, '-n', '2', '-u', 'all', '-e', engine])
+    games = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [game['seed'] for game in games] == [0, 1]
+    maze = np.array([[2, 0, 0, 0, 0, 1], [4, -1, 0, 0, 0, 0]], dtype=np.int8)
+    result = simulation.simulate(maze, 0, until='all', engine=engine)
+    assert games[0]['time'] == result.time
+    assert [(a['kind'], a['actor']) for a in games[0]['actors']] == [(2, 'speedy'), (4, 'jumper')]
@@ -0,0 +1,91 @@
+import random
+import pytest
+import numpy as np
+from maze import analyze, generate, wavefront
+from maze.teleport import TeleportSampler, _isqrt
+
+
+def good_targets(distances, row, col, min_goal=5, min_actor=5):
+    # all cells TeleporterActor may teleport to from (row, col)
+    rows, cols = np.indices(distances.shape)
+    good = (distances > min_goal) & ((rows - row) ** 2 + (cols - col) ** 2 > min_actor ** 2)
+    return set(map(tuple, np.argwhere(good).tolist()))
+
+
+class Picks:
+    # random.Random stand-in, randrange returns 0, 1, 2, ...
+
+    def __init__(self):
+        self.count = 0
+        self.allowed = None
+
+    def randrange(self, allowed):
+        self.allowed = allowed
+        self.count += 1
+        return self.count - 1
+
+
+@pytest.mark.parametrize('shape, seed', [((21, 21), 0), ((31, 15), 1), ((9, 41), 2)])
+def test_sample_all_targets(shape, seed):
+    distances = generate.generate(shape, 'backtracker', seed=seed)
+    distances = analyze(distances).distances
+    sampler = TeleportSampler(distances, 5, 5)
+    for row, col in [(0, 0), (shape[0] // 2, shape[1] // 2), (shape[0] - 1, 3), (4, shape[1] - 1)]:
+        expected = good_targets(distances, row, col)
+        picks = Picks()
+        targets = [sampler.sample_exact(picks, row, col)]
+        targets += [sampler.sample_exact(picks, row, col) for _ in range(picks.allowed - 1)]
+        assert picks.allowed == len(expected)  # each target exactly once
+        assert set(targets) == expected
+        rng = random.Random(seed)
+        assert all(sampler.sample(rng, row, col) in expected for _ in range(100))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_sample_many(seed):
+    distances = analyze(generate.generate((41, 41), 'backtracker', seed=seed)).distances
+    sampler = TeleportSampler(distances, 5, 5)
+    rng = np.random.RandomState(seed)
+    rows, cols = rng.randint(0, 41, 200), rng.randint(0, 41, 200)
+    target_rows, target_cols = sampler.sample_many(rng, rows, cols)
+    for row, col, target in zip(rows, cols, zip(target_rows.tolist(), target_cols.tolist())):
+        assert target in good_targets(distances, row, col)
+    # uniform over targets, chi-squared of one cell
+    target_rows, target_cols = sampler.sample_many(rng, np.zeros(20000, int), np.zeros(20000, int))
+    counts = np.bincount(target_rows * 41 + target_cols, minlength=41 * 41)
+    allowed = len(good_targets(distances, 0, 0))
+    assert np.count_nonzero(counts) == allowed
+    expected = 20000 / allowed
+    assert ((counts[counts > 0] - expected) ** 2 / expected).sum() < allowed + 5 * np.sqrt(2 * allowed)
+
+
+def test_no_target():
+    distances = np.array([[1, 2, 3, 4, 5, 6, 7]])
+    sampler = TeleportSampler(distances, 5, 5)
+    assert len(sampler) == 2  # cells 5 and 6, both within 5 of cell 3
+    assert sampler.sample(random.Random(0), 0, 3) == (0, 3)
+    assert sampler.sample_exact(Picks(), 0, 0) == (0, 6)
+    rows, cols = sampler.sample_many(np.random.RandomState(0), [0, 0], [3, 0])
+    assert rows.tolist() == [0, 0] and cols.tolist() == [3, 6]
+    assert TeleportSampler(distances, 7, 5).sample(random.Random(0), 0, 0) == (0, 0)
+
+
+@pytest.mark.parametrize('make_analysis', [analyze, wavefront.MazeAnalysis])
+def test_sampler_invalidated(make_analysis):
+    maze = generate.generate((21, 21), 'backtracker', seed=3)
+    analysis = make_analysis(maze)
+    sampler = TeleportSampler.of(analysis, 5, 5)
+    assert TeleportSampler.of(analysis, 5, 5) is sampler
+    assert TeleportSampler.of(analysis, 3, 5) is not sampler
+    row, col = np.argwhere(analysis.distances > 5)[0]
+    analysis.add_wall(row, col)
+    rebuilt = TeleportSampler.of(analysis, 5, 5)
+    assert rebuilt is not sampler
+    assert rebuilt.candidates.tolist() == np.flatnonzero(analysis.distances > 5).tolist()
+    assert row * 21 + col not in rebuilt.candidates
+
+
+def test_isqrt():
+    for n in list(range(200)) + [10 ** 30 - 1, 10 ** 30, (2 ** 52 + 1) ** 2 - 1]:
+        root = _isqrt(n)
+        assert root * root <= n < (root + 1) * (root + 1)
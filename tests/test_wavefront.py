@@ -0,0 +1,144 @@
+import pytest
+import numpy as np
+from maze import analysis, wavefront
+from test_analyze import verify_matrices, verify_path
+
+
+@pytest.mark.parametrize('mtype,number', [
+    ('simple', 1), ('simple', 2), ('simple', 3), ('simple', 4),
+    ('bounds', 1), ('bounds', 2), ('bounds', 3), ('bounds', 4),
+    ('multigoal', 1), ('multigoal', 2), ('multigoal', 3), ('multigoal', 4),
+    ('unreachable', 1), ('unreachable', 2)
+])
+def test_analysis(mazes, mtype, number):
+    maze = mazes[mtype][number]
+    result = wavefront.analyze(maze)
+    verify_matrices(maze, result)
+    reference = analysis.analyze(maze)
+    assert np.array_equal(result.distances, reference.distances)
+    assert np.array_equal(result.directions, reference.directions)
+
+
+@pytest.mark.parametrize('mtype,number,row,column', [
+    ('simple', 1, 1, 0), ('simple', 1, 1, 4), ('simple', 1, 3, 1),
+    ('multigoal', 4, 0, 0), ('multigoal', 4, 3, 0)
+])
+def test_paths(mazes, mtype, number, row, column):
+    maze = mazes[mtype][number]
+    verify_path(maze, wavefront.analyze(maze), row, column)
+
+
+@pytest.mark.parametrize('mtype,number,row,column', [
+    ('simple', 1, 0, 0), ('multigoal', 4, 4, 0),
+    ('unreachable', 1, 0, 0), ('unreachable', 2, 1, 1),
+])
+def test_paths_exception(mazes, mtype, number, row, column):
+    result = wavefront.analyze(mazes[mtype][number])
+    with pytest.raises(wavefront.NoPathExistsException):
+        result.path(row, column)
+
+
+@pytest.mark.parametrize('wall_share,goal_share', [(0.1, 0.2), (0.3, 0.001), (0.45, 0.01)])
+def test_random(wall_share, goal_share):
+    rng = np.random.RandomState(7)
+    maze = np.where(rng.rand(120, 90) < wall_share, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < goal_share] = 1
+    result = wavefront.analyze(maze)
+    reference = analysis.analyze(maze)
+    assert np.array_equal(result.distances, reference.distances)
+    assert np.array_equal(result.directions, reference.directions)
+    assert result.is_reachable == reference.is_reachable
+
+
+
+def test_out_of_int8():
+    maze = [[255, 0, 1], [-129, 0, 257], [-1, 0, 0]]
+    result = wavefront.analyze(maze)
+    reference = analysis.analyze(maze)
+    assert np.array_equal(result.directions, reference.directions)
+    assert result.directions[0, 0] == b'>' and result.directions[1, 0] == b'#'
+
+
+def test_walls(mazes):
+    maze = np.copy(mazes['multigoal'][4])
+    result = wavefront.analyze(maze)
+    for row, column in np.ndindex(maze.shape):
+        if maze[row, column] < 0:
+            maze[row, column] = 0
+            result.remove_wall(row, column)
+        else:
+            maze[row, column] = -1
+            result.add_wall(row, column)
+        verify_matrices(maze, result)
+
+
+def test_paths_batch(mazes):
+    maze = mazes['multigoal'][4]
+    starts = list(np.ndindex(maze.shape))
+    offsets, coords = wavefront.analyze(maze).paths(starts)
+    expected_offsets, expected_coords = analysis.analyze(maze).paths(starts)
+    assert np.array_equal(offsets, expected_offsets)
+    assert np.array_equal(coords, expected_coords)
+
+
+def test_path_union(mazes):
+    maze = mazes['multigoal'][4]
+    starts = list(np.ndindex(maze.shape))
+    counts = wavefront.analyze(maze).path_union(starts)
+    assert np.array_equal(counts, analysis.analyze(maze).path_union(starts))
+
+
+def test_path_overlay():
+    rng = np.random.RandomState(8)
+    maze = np.where(rng.rand(35, 45) < 0.3, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.005] = 1
+    directions = analysis.analyze(maze).directions
+    starts = rng.randint(0, 35, size=(30, 2)).astype('int32')
+    paths, arrows = wavefront.path_overlay(directions, starts)
+    expected_paths, expected_arrows = analysis.path_overlay(directions, starts)
+    assert np.array_equal(paths, expected_paths)
+    assert np.array_equal(arrows, expected_arrows)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_goals(seed):
+    rng = np.random.RandomState(seed)
+    maze = np.where(rng.rand(25, 30) < 0.3, -1, 0).astype('int8')
+    maze[rng.rand(*maze.shape) < 0.05] = 1
+    result = wavefront.analyze(maze)
+    reference = analysis.analyze(maze)
+    assert np.array_equal(result.goal_id, reference.goal_id)
+    assert np.array_equal(result.distances_per_goal(), reference.distances_per_goal())
+    assert np.array_equal(result.distances_per_goal(2), reference.distances_per_goal(2))
+    with pytest.raises(ValueError):
+        result.distances_per_goal(np.count_nonzero(maze == 1) + 1)
+    row, column = np.argwhere(maze == 0)[0]
+    result.add_wall(row, column)
+    reference.add_wall(row, column)
+    assert np.array_equal(result.goal_id, reference.goal_id)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'engine': 'bfs'}, {'weighted': True}, {'compact': True},
+])
+def test_extension_only(kwargs):
+    with pytest.raises(ValueError):
+        wavefront.analyze([[0, 1]], **kwargs)
+
+
+@pytest.mark.parametrize('engine', wavefront.ENGINES)
+def test_engine_ignored(mazes, engine):
+    maze = mazes['multigoal'][4]
+    result = wavefront.analyze(maze, engine=engine)
+    assert np.array_equal(result.directions, analysis.analyze(maze).directions)
+
+
+def test_out(mazes):
+    maze = mazes['multigoal'][4]
+    distances = np.zeros(maze.shape, dtype='int32')
+    directions = np.zeros(maze.shape, dtype='S1')
+    result = wavefront.analyze(maze, out=(distances, directions))
+    assert result.distances is distances and result.directions is directions
+    assert np.array_equal(directions, analysis.analyze(maze).directions)
+    with pytest.raises(ValueError):
+        wavefront.analyze(maze, out=(distances[1:], directions[1:]))